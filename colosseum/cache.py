@@ -0,0 +1,278 @@
+"""
+Caches the results of matches on disk so that repeated tournaments only play
+the pairings whose inputs changed.
+
+A match is keyed on everything that can change its outcome: the source of
+every bot module, the game (the hoster and the modules of its package that it
+uses), the arguments passed to start_game, the hoster parameters, the number
+of games, the seed of the host's random module and the version of the engine
+itself. Changing any of them simply produces a new key, so stale entries are
+never read. They age out under the size bound, which evicts the least
+recently used entries first.
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+from importlib import import_module
+from importlib.util import find_spec
+from time import time
+from types import ModuleType
+from typing import Callable, Dict, Iterable, List, Union
+
+# Bump when a change outside of the hashed engine sources changes results
+ENGINE_VERSION = 1
+ENGINE_PACKAGES = ('colosseum.ipc', 'colosseum.games')
+
+def _hash_files(paths:Iterable[str], root:str)->str:
+	h = hashlib.sha256()
+	for path in sorted(paths):
+		h.update(os.path.relpath(path, root).encode() + b'\0')
+		with open(path, 'rb') as f:
+			h.update(f.read())
+		h.update(b'\0')
+	return h.hexdigest()
+
+def _package_files(directory:str, recursive:bool=True)->List[str]:
+	paths = []
+	for root, dirs, files in os.walk(directory):
+		dirs[:] = sorted(d for d in dirs if d != '__pycache__') \
+			if recursive else []
+		paths.extend(os.path.join(root, f) for f in files if f.endswith('.py'))
+	return paths
+
+def source_hash(module:str)->str:
+	"""
+	Hashes the source of a bot module. If the module is a package, every
+	python file inside of it is included.
+	params:
+		module:str - The module, as passed to `python3 -m`
+	"""
+	spec = find_spec(module)
+	if spec is None:
+		raise ModuleNotFoundError(f'No module named {module!r}')
+	if spec.submodule_search_locations:
+		directory = list(spec.submodule_search_locations)[0]
+		return _hash_files(_package_files(directory), directory)
+	return _hash_files([spec.origin], os.path.dirname(spec.origin))
+
+def engine_hash()->str:
+	"""
+	Hashes the parts of colosseum that games are played with: the IPC layer
+	and the modules shared by every game. The games themselves are hashed
+	separately (see game_hash).
+	"""
+	paths = []
+	for package in ENGINE_PACKAGES:
+		paths += _package_files(os.path.dirname(find_spec(package).origin),
+			recursive=False)
+	root = os.path.dirname(find_spec('colosseum').origin)
+	return f'{ENGINE_VERSION}:{_hash_files(paths, root)}'
+
+def game_hash(hoster_type:type)->str:
+	"""
+	Hashes the module defining the hoster and every module of the same package
+	that it uses at module level (i.e. its tracker). Other bots living in the
+	game's package do not affect the hash.
+	"""
+	module = sys.modules[hoster_type.__module__]
+	package = module.__name__.rpartition('.')[0]
+	paths = {module.__file__}
+	for value in vars(module).values():
+		name = value.__name__ if isinstance(value, ModuleType) \
+			else getattr(value, '__module__', None)
+		if isinstance(name, str) and name.startswith(package + '.'):
+			used = sys.modules.get(name)
+			if getattr(used, '__file__', None):
+				paths.add(used.__file__)
+	return _hash_files(paths, os.path.dirname(module.__file__))
+
+def _digest(inputs:Dict)->str:
+	return hashlib.sha256(
+		json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+def _resolve(hoster:Union[str, type])->type:
+	if isinstance(hoster, str):
+		module, _, name = hoster.rpartition('.')
+		return getattr(import_module(module), name)
+	return hoster
+
+class ResultCache:
+	"""
+	A directory of match results, bounded in size.
+	"""
+	def __init__(self, directory:str=None, max_bytes:int=64*2**20,
+			engine:str=None):
+		"""
+		params:
+			directory:str=None - Where the results are stored. Defaults to
+				$XDG_CACHE_HOME/colosseum/results
+			max_bytes:int=64MiB - The least recently used results are evicted
+				once the cache grows larger than this
+			engine:str=None - The engine version results are keyed on.
+				Defaults to engine_hash()
+		"""
+		if directory is None:
+			directory = os.path.join(os.environ.get('XDG_CACHE_HOME',
+				os.path.expanduser('~/.cache')), 'colosseum', 'results')
+		os.makedirs(directory, exist_ok=True)
+		self._directory = directory
+		self._max_bytes = max_bytes
+		self._engine = engine_hash() if engine is None else engine
+		self._hashes = {}
+	
+	@property
+	def directory(self)->str:
+		return self._directory
+	
+	@property
+	def engine(self)->str:
+		return self._engine
+	
+	def _source_hash(self, module:str)->str:
+		# Bots are hashed once per cache, not once per match
+		if module not in self._hashes:
+			self._hashes[module] = source_hash(module)
+		return self._hashes[module]
+	
+	def inputs(self, hoster:Union[str, type], players:List[str],
+			n_games:int, *args, seed:int=None, hoster_params:Dict=None,
+			**kwargs)->Dict:
+		"""
+		Everything a match's result is keyed on.
+		params:
+			hoster:Union[str, type] - The GameHoster subclass, or its dotted
+				path
+			players:List[str] - The bot modules
+			n_games:int - The number of games in the match
+			*args, **kwargs - Passed to GameHoster.start_game, i.e. the board
+				size
+			seed:int=None - The seed of the host's random module
+			hoster_params:Dict=None - Passed to the GameHoster, i.e.
+				turn_timeout
+		"""
+		hoster_type = _resolve(hoster)
+		return {
+			'engine': self._engine,
+			'game': f'{hoster_type.__module__}.{hoster_type.__qualname__}',
+			'game_hash': game_hash(hoster_type),
+			'players': [[p, self._source_hash(p)] for p in players],
+			'n_games': n_games,
+			'args': list(args),
+			'kwargs': kwargs,
+			'seed': seed,
+			'hoster_params': hoster_params or {},
+		}
+	
+	def key(self, *args, **kwargs)->str:
+		"""
+		The key of a match. Takes the same arguments as inputs.
+		"""
+		return _digest(self.inputs(*args, **kwargs))
+	
+	def _path(self, key:str)->str:
+		return os.path.join(self._directory, f'{key}.json')
+	
+	def get(self, key:str)->List[List[int]]:
+		"""
+		returns:
+			List[List[int]] - The points of every game of the match, or None
+				if it is not cached
+		"""
+		path = self._path(key)
+		try:
+			with open(path) as f:
+				entry = json.load(f)
+			os.utime(path)
+		except (OSError, ValueError):
+			return None
+		return entry['points']
+	
+	def put(self, key:str, points:List[List[int]], inputs:Dict=None):
+		"""
+		Stores the points of every game of a match and evicts the least
+		recently used matches if the cache has grown too large.
+		params:
+			inputs:Dict=None - Stored alongside the points for reference
+		"""
+		path = self._path(key)
+		tmp = f'{path}.{os.getpid()}.tmp'
+		with open(tmp, 'w') as f:
+			json.dump({'inputs': inputs, 'created': time(), 'points': points},
+				f)
+		os.replace(tmp, path)
+		self.evict()
+	
+	def evict(self, max_bytes:int=None):
+		"""
+		Removes the least recently used matches until the cache fits in
+		max_bytes (the size given on construction by default)
+		"""
+		max_bytes = self._max_bytes if max_bytes is None else max_bytes
+		entries = []
+		total = 0
+		with os.scandir(self._directory) as it:
+			for entry in it:
+				if entry.name.endswith('.json'):
+					stat = entry.stat()
+					entries.append((stat.st_mtime, stat.st_size, entry.path))
+					total += stat.st_size
+		entries.sort()
+		for _, size, path in entries:
+			if total <= max_bytes:
+				break
+			try:
+				os.remove(path)
+			except FileNotFoundError:
+				pass
+			total -= size
+	
+	def clear(self):
+		"""
+		Removes every match
+		"""
+		self.evict(0)
+	
+	def play(self, hoster:Union[str, type], players:List[str], n_games:int,
+			*args, seed:int=None, hoster_params:Dict=None, coordinator=None,
+			callback:Callable[[List[int]], None]=None,
+			**kwargs)->List[List[int]]:
+		"""
+		Returns the cached points of a match, playing it first if it is not
+		cached.
+		params:
+			See inputs
+			coordinator:Coordinator=None - If given, the match is played on
+				the coordinator's workers instead of locally. The workers are
+				not seeded and hoster_params cannot be given.
+			callback:Callable=None - Called with the points of every game
+				that is played (not for cached games)
+		returns:
+			List[List[int]] - The points of every game, in the original player
+				order
+		"""
+		inputs = self.inputs(hoster, players, n_games, *args, seed=seed,
+			hoster_params=hoster_params, **kwargs)
+		key = _digest(inputs)
+		points = self.get(key)
+		if points is not None:
+			return points
+		
+		if coordinator is not None:
+			if hoster_params:
+				raise ValueError('hoster_params cannot be sent to workers')
+			points = coordinator.run(inputs['game'], players, n_games, *args,
+				callback=callback, **kwargs)
+		else:
+			if seed is not None:
+				random.seed(seed)
+			game = _resolve(hoster)(players, **(hoster_params or {}))
+			points = []
+			for _ in range(n_games):
+				points.append(game.start_game(*args, **kwargs))
+				if callback is not None:
+					callback(points[-1])
+		self.put(key, points, inputs)
+		return points
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""
+Distributes games across worker daemons. A worker hosts the GameClients (and 
+therefore the bot processes) and plays games on behalf of a central 
+Coordinator, streaming the results back over a persistent socket connection. 
+Workers may run on the same machine or on any host reachable over TCP. 
+"""
+
+__all__ = ['Coordinator', 'Worker', 'WorkerError', 'serve', 'spawn']
+
+from .coordinator import Coordinator, WorkerError
+from .worker import Worker, serve, spawn
\ No newline at end of file
@@ -0,0 +1,108 @@
+import queue
+import threading
+from typing import Callable, List
+
+from colosseum.ipc import SocketComs
+
+class WorkerError(Exception):
+	...
+
+class Coordinator:
+	"""
+	Schedules games across worker daemons. 
+	
+	A pool of persistent connections is opened to every worker on 
+	construction. Each connection runs one batch of games at a time, so 
+	connections_per_worker is the number of games a worker plays in parallel.
+	"""
+	def __init__(self, workers:List[str], connections_per_worker:int=1):
+		"""
+		params:
+			workers:List[str] - The addresses of the workers. Each is either 
+				`<host>:<port>` or `unix:<path>`
+			connections_per_worker:int=1 - Connections to open to each worker
+		"""
+		self._connections = [SocketComs.connect(address) 
+			for address in workers for _ in range(connections_per_worker)]
+		self._lock = threading.Lock()
+	
+	@property
+	def n_connections(self)->int:
+		return len(self._connections)
+	
+	def run(self, hoster:str, players:List[str], n_games:int, *args, 
+			batch_size:int=10, callback:Callable[[List[int]], None]=None, 
+			**kwargs)->List[List[int]]:
+		"""
+		Plays n_games games spread over every worker connection. 
+		params:
+			hoster:str - Dotted path to the GameHoster subclass
+				i.e. `colosseum.games.dotsnboxes.DnBHoster`
+			players:List[str] - The bot modules, as passed to GameHoster
+			n_games:int - The number of games to play
+			*args, **kwargs - Passed to GameHoster.start_game
+			batch_size:int=10 - The number of games to hand to a worker at a 
+				time
+			callback:Callable=None - Called with the points of every game as 
+				soon as it is received
+		returns:
+			List[List[int]] - The points of every game, in the order they were
+				received
+		"""
+		batches = queue.Queue()
+		for start in range(0, n_games, batch_size):
+			batches.put(min(batch_size, n_games-start))
+		
+		results = []
+		errors = []
+		def drain(coms:SocketComs):
+			try:
+				_drain(coms)
+			except Exception as e:
+				errors.append(f'{type(e).__name__}: {e}')
+		def _drain(coms:SocketComs):
+			while not errors:
+				try:
+					size = batches.get_nowait()
+				except queue.Empty:
+					return
+				coms.send(run={'hoster': hoster, 'players': players, 
+					'n_games': size, 'args': args, 'kwargs': kwargs})
+				while True:
+					msg = coms.recv()
+					if 'result' in msg:
+						points = msg['result']['points']
+						with self._lock:
+							results.append(points)
+							if callback is not None:
+								callback(points)
+					elif 'error' in msg:
+						errors.append(msg['error']['message'])
+						return
+					elif 'done' in msg:
+						break
+		
+		threads = [threading.Thread(target=drain, args=(coms,), daemon=True)
+			for coms in self._connections]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		
+		if errors:
+			raise WorkerError(errors[0])
+		return results
+	
+	def close(self):
+		for coms in self._connections:
+			coms.close()
+		self._connections = []
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, *exc):
+		self.close()
+	
+	def __del__(self):
+		self.close()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import argparse
+import os
+import socket
+from importlib import import_module
+from typing import Dict, Iterable, List, Tuple
+
+from colosseum.games import GameHoster
+from colosseum.ipc import SocketComs
+from colosseum.ipc.socketcoms import listen
+
+# Coordinators are not authenticated and the worker imports and runs whatever
+# modules they name, so by default only the bundled games and bots are served
+DEFAULT_ALLOWED = ('colosseum.games',)
+
+def is_allowed(module:str, allowed:Iterable[str])->bool:
+	"""
+	True if module is one of the allowed modules or packages, or inside of one
+	"""
+	return any(module == prefix or module.startswith(prefix + '.') 
+		for prefix in allowed)
+
+def load_hoster(path:str)->type:
+	"""
+	Resolves a dotted path such as `colosseum.games.dotsnboxes.DnBHoster` into
+	the GameHoster subclass it names. 
+	"""
+	module, _, name = path.rpartition('.')
+	hoster_type = getattr(import_module(module), name)
+	if not (isinstance(hoster_type, type) 
+			and issubclass(hoster_type, GameHoster)):
+		raise TypeError(f'{path} is not a GameHoster!')
+	return hoster_type
+
+class Worker:
+	"""
+	Plays games for a single coordinator connection. 
+	
+	Hosters (and their bot processes) are kept alive for the lifetime of the
+	connection so that successive batches with the same players do not pay 
+	the bot startup cost again. 
+	"""
+	def __init__(self, coms:SocketComs, 
+			allowed:Iterable[str]=DEFAULT_ALLOWED):
+		"""
+		params:
+			coms:SocketComs - The connection to the coordinator
+			allowed:Iterable[str]=DEFAULT_ALLOWED - The modules and packages 
+				the coordinator may name as hosters and bots
+		"""
+		self._coms = coms
+		self._allowed = tuple(allowed)
+		self._hosters:Dict[Tuple[str, Tuple[str, ...]], GameHoster] = {}
+		
+		self._commands = {'run': self._run}
+	
+	def run(self):
+		"""
+		Services requests until the coordinator hangs up. 
+		"""
+		try:
+			while True:
+				msg = self._coms.recv()
+				for command, params in msg.items():
+					target = self._commands.get(command, None)
+					if target is not None:
+						target(**params)
+		finally:
+			self._hosters.clear()
+			self._coms.close()
+	
+	def _get_hoster(self, hoster:str, players:List[str])->GameHoster:
+		for module in [hoster.rpartition('.')[0], *players]:
+			if not isinstance(module, str) or \
+					not is_allowed(module, self._allowed):
+				raise PermissionError(f'{module} is not allowed on this worker')
+		key = (hoster, tuple(players))
+		if key not in self._hosters:
+			self._hosters[key] = load_hoster(hoster)(players)
+		return self._hosters[key]
+	
+	def _run(self, hoster:str, players:List[str], n_games:int, args=(), 
+			kwargs=None):
+		"""
+		Plays n_games games and streams every result back. 
+		"""
+		try:
+			game_hoster = self._get_hoster(hoster, players)
+		except Exception as e:
+			self._coms.send(error={'message': f'{type(e).__name__}: {e}'})
+			return
+		
+		for _ in range(n_games):
+			points = game_hoster.start_game(*args, **(kwargs or {}))
+			self._coms.send(result={'points': points})
+		self._coms.send(done={'n_games': n_games})
+
+def _reap():
+	"""
+	Collects any connection handlers that have exited. 
+	"""
+	try:
+		while os.waitpid(-1, os.WNOHANG)[0]:
+			pass
+	except ChildProcessError:
+		pass
+
+def _serve(sock:socket.socket, allowed:Iterable[str]):
+	while True:
+		conn, _ = sock.accept()
+		_reap()
+		pid = os.fork()
+		if pid:
+			# We are the parent
+			conn.close()
+		else:
+			# We are the connection handler
+			sock.close()
+			try:
+				Worker(SocketComs(True, conn), allowed).run()
+			finally:
+				os._exit(0)
+
+def serve(address:str, allowed:Iterable[str]=DEFAULT_ALLOWED):
+	"""
+	Runs a worker daemon on the given address. Every coordinator connection is
+	handled in its own forked process. Never returns. Anyone who can connect 
+	can run the allowed modules, so only listen on trusted interfaces. 
+	params:
+		address:str - `<host>:<port>` or `unix:<path>`
+		allowed:Iterable[str]=DEFAULT_ALLOWED - See Worker
+	"""
+	_serve(listen(address), tuple(allowed))
+
+def spawn(address:str, allowed:Iterable[str]=DEFAULT_ALLOWED)->int:
+	"""
+	Starts a worker daemon in a forked process. The address is bound before 
+	returning so that it can be connected to immediately. 
+	params:
+		address:str - See serve
+		allowed:Iterable[str]=DEFAULT_ALLOWED - See Worker
+	returns:
+		int - The pid of the worker daemon
+	"""
+	sock = listen(address)
+	pid = os.fork()
+	if pid:
+		sock.close()
+		return pid
+	try:
+		_serve(sock, tuple(allowed))
+	finally:
+		os._exit(0)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(
+		description='Run a BotColosseum worker daemon.')
+	parser.add_argument('address', help='<host>:<port> or unix:<path>. '
+		'Coordinators are not authenticated, so only bind to trusted '
+		'interfaces (i.e. 127.0.0.1).')
+	parser.add_argument('--allow', action='append', default=[], 
+		metavar='MODULE', help='a module or package coordinators may run as '
+		'a hoster or bot, in addition to colosseum.games. May be repeated.')
+	args = parser.parse_args()
+	serve(args.address, DEFAULT_ALLOWED + tuple(args.allow))
\ No newline at end of file
@@ -1,5 +1,14 @@
-__all__ = ['GameClient', 'GameHoster', 'GameTracker']
+__all__ = ['Bool', 'GameClient', 'GameHoster', 'GameTracker', 'Int', 
+	'InvalidMoveException', 'MoveSchema']
 
-from .gameclient import GameClient
-from .gamehoster import GameHoster
-from .gametracker import GameTracker
\ No newline at end of file
+from colosseum.lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+	'Bool': 'schema',
+	'GameClient': 'gameclient',
+	'GameHoster': 'gamehoster',
+	'GameTracker': 'gametracker',
+	'Int': 'schema',
+	'InvalidMoveException': 'schema',
+	'MoveSchema': 'schema',
+})
\ No newline at end of file
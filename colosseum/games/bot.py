@@ -1,17 +1,30 @@
+import os
 import sys
+import time
 from abc import ABC, abstractmethod
-from typing import Callable, Dict
+from base64 import b64decode
+from types import SimpleNamespace
+from typing import Callable, Dict, Hashable
 
 from colosseum.ipc import FileNoComs
+from colosseum.games.usage import MEMORY_EXIT_CODE
 
 pipeout_fileno = sys.stdout.fileno()
 pipein_fileno = sys.stdin.fileno()
 
-_coms = FileNoComs(
-	True,
-	read_fileno=pipein_fileno,
-	write_fileno=pipeout_fileno
-)
+# Opened on first use so that merely importing this module (i.e. on the host)
+# does not take over stdin and stdout
+_coms = None
+
+def _get_coms()->FileNoComs:
+	global _coms
+	if _coms is None:
+		_coms = FileNoComs(
+			True,
+			read_fileno=pipein_fileno,
+			write_fileno=pipeout_fileno
+		)
+	return _coms
 
 def log(*args, **kwargs):
 	"""
@@ -21,7 +34,7 @@ def log(*args, **kwargs):
 	The parent process will only service the request when it expects a message
 	from this process. I.e. during this bot's turn. 
 	"""
-	_coms.send(log={'args': args, 'kwargs': kwargs})
+	_get_coms().send(log={'args': args, 'kwargs': kwargs})
 
 def get_input(*args, **kwargs):
 	"""
@@ -31,32 +44,59 @@ def get_input(*args, **kwargs):
 	The parent process will only service the request when it expects a message
 	from this process. I.e. during this bot's turn. 
 	"""
-	_coms.send(input={'args': args, 'kwargs':kwargs})
-	response = _coms.recv()
+	coms = _get_coms()
+	coms.send(input={'args': args, 'kwargs':kwargs})
+	response = coms.recv()
 	return response.get('s', '')
 
 class Bot(ABC):
 	"""
 	Base class for a bot. 
+	
+	A single bot process may play several games at once. Every game is 
+	identified by the gid the host sends along with new_game, update and 
+	your_turn, and has its own GameTracker (self.game) and scratch space 
+	(self.state). Both always refer to the game currently being handled. 
+	
+	Bots that never look at the game state can set receives_updates to False
+	so that the host stops sending them updates. self.game then stays at the
+	initial state. 
 	"""
+	receives_updates = True
+	
 	def __init__(self, tracker_type:type):
 		"""
 		params:
 			tracker_type:type - The type of the associated GameTracker
 		"""
 		self._tracker_type = tracker_type
+		self._games = {}
+		self._states = {}
+		self._opponents = {}
+		self._memories = {}
+		self._gid = None
+		self._profiler = None
+		self._profile_turns = 0
+		self._store = None
 		
 		self._commands = {'stop': self._stop, 'new_game': self._new_game, 
-			'update': self._update, 'your_turn': self._take_turn}
+			'update': self._update, 'your_turn': self._take_turn, 
+			'resync': self._resync, 'ping': self._ping, 
+			'profile': self._profile, 'end_game': self._end_game}
 		
-		while(True):
-			msg = _coms.recv()
-			for command, params in msg.items():
-				# I cannot use the walrus operator since this might run on 
-				# earlier versions of python
-				target = self._commands.get(command, None)
-				if target is not None:
-					target(**params)
+		coms = _get_coms()
+		try:
+			while(True):
+				msg = coms.recv()
+				for command, params in msg.items():
+					# I cannot use the walrus operator since this might run on 
+					# earlier versions of python
+					target = self._commands.get(command, None)
+					if target is not None:
+						target(**params)
+		except MemoryError:
+			# Let the host know that the memory limit was hit
+			os._exit(MEMORY_EXIT_CODE)
 	
 	def _register_commands(self, commands:Dict[str, Callable]):
 		self._commands.update(commands)
@@ -64,25 +104,130 @@ class Bot(ABC):
 	def _register_command(self, command:str, target:Callable):
 		self._register_commands({command: target})
 	
+	def _ping(self, **kwargs):
+		# Reports when the bot finished starting up
+		_coms.send(pong={'args': [time.time()], 
+			'kwargs': {'updates': self.receives_updates}})
+	
 	def _stop(self, **kwargs):
+		if self._store is not None:
+			self._store.close()
 		_coms.close()
 		exit(kwargs.get('eid', 0))
 	
-	def _update(self, **kwargs):
-		self._game.update(**kwargs)
-		self.update()
+	def _update(self, gid:Hashable=None, **kwargs):
+		if gid not in self._games:
+			return
+		self._gid = gid
+		self._call(self._apply_update, kwargs)
 	
-	def _take_turn(self, **kwargs):
-		response = self.take_turn()
+	def _take_turn(self, gid:Hashable=None, **kwargs):
+		if gid not in self._games:
+			# We do not know this game (i.e. we were restarted mid-game)
+			_coms.send(gid=gid)
+			return
+		self._gid = gid
+		response = self._call(self.take_turn)
+		if gid is not None:
+			response = dict(response, gid=gid)
+		if self._profiler is not None:
+			self._profile_turns -= 1
+			if self._profile_turns <= 0:
+				response = dict(response, profile_data=self._stop_profile())
 		_coms.send(**response)
 	
-	def _new_game(self, **game_params):
-		self._game = self._tracker_type(**game_params)
-		self.new_game()
+	def _profile(self, turns:int=1, **kwargs):
+		# Imported here so that bots that are never profiled do not pay for it
+		import cProfile
+		if self._profiler is None:
+			self._profiler = cProfile.Profile()
+		self._profile_turns = turns
+	
+	def _call(self, f:Callable, *args):
+		"""
+		Calls into the bot's own code, under the profiler if there is one so 
+		that time spent waiting on the host is not measured
+		"""
+		if self._profiler is None:
+			return f(*args)
+		self._profiler.enable()
+		try:
+			return f(*args)
+		finally:
+			self._profiler.disable()
+	
+	def _apply_update(self, kwargs:dict):
+		self.game.update(**kwargs)
+		self.update()
+	
+	def _stop_profile(self)->dict:
+		from colosseum.games.profiling import encode_stats
+		self._profiler.create_stats()
+		stats = encode_stats(self._profiler.stats)
+		self._profiler = None
+		return {'args': [stats]}
+	
+	def _new_game(self, gid:Hashable=None, opponents=None, **game_params):
+		self._gid = gid
+		self._games[gid] = self._tracker_type(**game_params)
+		self._states[gid] = SimpleNamespace()
+		self._opponents[gid] = tuple(sorted(opponents or ()))
+		self._call(self.new_game)
+	
+	def _end_game(self, gid:Hashable=None, **kwargs):
+		if gid not in self._games:
+			return
+		self._gid = gid
+		self._call(self.end_game)
+		if self._store is not None:
+			self._store.flush()
+	
+	def _resync(self, snapshot:str, gid:Hashable=None, **game_params):
+		self._new_game(gid=gid, **game_params)
+		self.game.restore(b64decode(snapshot))
+		self._call(self.resync)
 	
 	@property
 	def game(self):
-		return self._game
+		return self._games.get(self._gid, None)
+	
+	@property
+	def state(self)->SimpleNamespace:
+		"""
+		Scratch space for the current game. Store per-game state here rather 
+		than on self so that games played at the same time do not interfere.
+		"""
+		return self._states.get(self._gid, None)
+	
+	@property
+	def opponents(self)->tuple:
+		"""
+		The bot modules of the other players in the current game, sorted
+		"""
+		return self._opponents.get(self._gid, ())
+	
+	@property
+	def opponent_memory(self)->dict:
+		"""
+		A dictionary that persists across every game against the same set of
+		opponents. Bots that want to learn about their opponents can opt in 
+		by storing what they learn here. 
+		"""
+		return self._memories.setdefault(self.opponents, {})
+	
+	@property
+	def store(self)->'Store':
+		"""
+		A key-value and array store that persists across games, restarts and
+		tournaments (see colosseum.games.store). It is only persisted if the 
+		host gave the bot a store_dir, is private to the bot module and is 
+		flushed at the end of every game. It is opened on first use. 
+		"""
+		if self._store is None:
+			# Imported here so that bots without a store do not pay for it
+			from colosseum.games.store import Store
+			self._store = Store.from_env()
+		return self._store
 	
 	@abstractmethod
 	def take_turn(self):
@@ -97,12 +242,29 @@ class Bot(ABC):
 	def update(self):
 		...
 	
+	def resync(self):
+		"""
+		Called when the host has replaced the state of the current game with 
+		a snapshot, i.e. after this bot was restarted mid-game. new_game has 
+		already been called with the original game parameters. Override this
+		if the bot derives any state from the game as it progresses. 
+		"""
+		...
+	
+	def end_game(self):
+		"""
+		Called once the current game is over, before the store is flushed. 
+		self.game holds the last state this bot was sent. 
+		"""
+		...
+	
 	@abstractmethod
 	def new_game(self):
 		"""
 		A 'reset' method to start a new game. This does not have to reset the 
 		bot to its original state. The reason to use a resetter over 
 		re-instantiating or re-initializing the object is to allow for 
-		'remembering' behavior. 
+		'remembering' behavior. Use self.store for memories that should 
+		outlive the process. 
 		"""
 		...
\ No newline at end of file
@@ -8,7 +8,12 @@ player captured is counted and the player with the highest number of captures
 wins. 
 """
 
-__all__ = ['DnBHoster', 'DnBTracker']
+__all__ = ['DnBHoster', 'DnBTracker', 'Recorder']
 
-from .hoster import DnBHoster
-from .tracker import DnBTracker
\ No newline at end of file
+from colosseum.lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+	'DnBHoster': 'hoster',
+	'DnBTracker': 'tracker',
+	'Recorder': 'recorder',
+})
\ No newline at end of file
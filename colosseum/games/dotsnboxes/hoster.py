@@ -2,6 +2,16 @@ from .tracker import DnBTracker
 from colosseum.games import GameHoster
 
 class DnBHoster(GameHoster):
+	def __init__(self, *args, recorder=None, **kwargs):
+		"""
+		params:
+			recorder:Recorder=None - If given, every move is recorded as 
+				training data (see colosseum.games.dotsnboxes.recorder)
+			*args, **kwargs - Passed to GameHoster
+		"""
+		super().__init__(*args, **kwargs)
+		self._recorder = recorder
+	
 	def play(self, n:int=5)->DnBTracker:
 		"""
 		params:
@@ -13,33 +23,26 @@ class DnBHoster(GameHoster):
 		
 		for i, p in enumerate(self._players):
 			p.new_game({'playerid': i, 'n': n})
+		self._spectate(game)
 		
 		while not game.is_done:
 			player_id = game.whose_turn
 			player = self._players[player_id]
 			response = player.take_turn()
 			
-			# unpack response
-			try:
-				horizontal = response['horizontal']
-				row = response['row']
-				col = response['col']
-				if not (isinstance(horizontal, bool) and isinstance(row, int) 
-						and isinstance(col, int)):
-					raise KeyError()
-			except KeyError:
+			move = game.decode_move(response)
+			if move is None:
 				game.forfeit(player_id)
 				break
+			horizontal, row, col = move
+			if self._recorder is not None:
+				self._recorder.record(game, player_id, horizontal, row, col)
 			game.update(player=player_id, horizontal=horizontal, row=row, 
 				col=col)
 			self._broadcast(player=player_id, horizontal=horizontal, row=row, 
 				col=col)
+			self._spectate(game, response)
 		
-		return game
-	
-	def _broadcast(self, **kwargs):
-		"""
-		Updates all players to the new gamestate. Called after every move. 
-		"""
-		for p in self._players:
-			p.update(**kwargs)
+		if self._recorder is not None:
+			self._recorder.end_game(game)
+		return game
\ No newline at end of file
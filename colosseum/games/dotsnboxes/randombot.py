@@ -13,13 +13,16 @@ class RandomBot(Bot):
 	When the gamestate is updated (in update()), the latest move is removed 
 	from the list. This is to prevent the same move being made twice. To take
 	a turn, the last move in the list is simply returned. 
+	
+	The list is kept in self.state so that the bot can play several games at 
+	once. 
 	"""
 	
 	def __init__(self):
 		super().__init__(DnBTracker)
 	
 	def take_turn(self):
-		move = self._moves[-1]
+		move = self.state.moves[-1]
 		return self.game.make_move(*move[1:])
 	
 	def update(self):
@@ -27,20 +30,26 @@ class RandomBot(Bot):
 		# Recreate the latest move but with our playerid
 		latest_move = Move(self.game.playerid, latest_move.horizontal, 
 			latest_move.row, latest_move.col)
-		self._moves.remove(latest_move)
+		self.state.moves.remove(latest_move)
+	
+	def resync(self):
+		# Drop the moves that were made before we (re)joined the game
+		self.state.moves = [m for m in self.state.moves 
+			if not (self.game.hlines if m.horizontal else self.game.vlines)[
+				m.row][m.col]]
 	
 	def new_game(self):
-		self._moves = []
+		moves = self.state.moves = []
 		# A list of all possible horizontal moves
 		horizontal_moves = [Move(self.game.playerid, True, row, col) 
-			for row, col in product(range(self.game.n-1), range(self.game.n-2))]
+			for row, col in product(range(self.game.n), range(self.game.n-1))]
 		# A list of all possible vertical moves
 		vertical_moves = [Move(self.game.playerid, False, row, col) 
-			for row, col in product(range(self.game.n-2), range(self.game.n-1))]
-		self._moves.extend(horizontal_moves)
-		self._moves.extend(vertical_moves)
+			for row, col in product(range(self.game.n-1), range(self.game.n))]
+		moves.extend(horizontal_moves)
+		moves.extend(vertical_moves)
 		# Shuffle the list of all possible moves
-		random.shuffle(self._moves)
+		random.shuffle(moves)
 
 if __name__ == '__main__':
 	RandomBot()
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Records Dots and Boxes games as training data.
+
+Every move becomes one row holding the board before the move, the player to
+move, the move itself and the final outcome of the game for that player. The
+rows of a game are buffered in memory while it is played, the outcome is
+back-filled when it ends and the whole game is then copied into fixed-size,
+memory-mapped .npy shards. A manifest.json lists the shards and the number of
+rows each one holds, so the data can be read back zero-copy with read_shards.
+"""
+
+import json
+import os
+from typing import List
+
+import numpy as np
+
+from .tracker import DnBTracker
+
+MANIFEST = 'manifest.json'
+_MANIFEST_VERSION = 1
+
+def row_dtype(n:int)->np.dtype:
+	"""
+	The dtype of a row for an n x n board
+	params:
+		n:int - Side length of the board
+	"""
+	return np.dtype([
+		('game', np.uint32),
+		('hlines', np.uint8, (n, n-1)),
+		('vlines', np.uint8, (n-1, n)),
+		('boxes', np.int8, (n-1, n-1)),
+		('player', np.int8),
+		('horizontal', np.bool_),
+		('row', np.uint16),
+		('col', np.uint16),
+		# 1 if the player to move won the game, 0 for a draw, -1 for a loss
+		('outcome', np.int8),
+	])
+
+class Recorder:
+	"""
+	Streams the moves of DnB games to memory-mapped shards. Pass it to a
+	DnBHoster to record every game it plays.
+	"""
+	def __init__(self, directory:str, n:int=5, shard_size:int=1<<16):
+		"""
+		params:
+			directory:str - Where the shards and the manifest are written. If
+				the directory already holds a recording of the same board
+				size, new games are appended to it in new shards.
+			n:int=5 - Side length of the boards to record
+			shard_size:int=65536 - The number of rows in a shard
+		"""
+		os.makedirs(directory, exist_ok=True)
+		self._directory = directory
+		self._n = n
+		self._shard_size = shard_size
+		self._dtype = row_dtype(n)
+		
+		self._manifest = read_manifest(directory) \
+			if os.path.exists(os.path.join(directory, MANIFEST)) else {
+				'version': _MANIFEST_VERSION,
+				'n': n,
+				'dtype': self._dtype.descr,
+				'shards': [],
+				'games': 0,
+			}
+		assert self._manifest['n'] == n, \
+			f'{directory} holds games with n={self._manifest["n"]}, not {n}!'
+		self._games = self._manifest['games']
+		
+		# The game being played. Every move is recorded here first so that
+		# the outcome can be filled in before the rows reach the shards.
+		self._buffer = np.zeros(2*n*(n-1), dtype=self._dtype)
+		self._moves = 0
+		
+		self._shard = None
+		self._rows = 0
+	
+	@property
+	def directory(self)->str:
+		return self._directory
+	
+	@property
+	def games(self)->int:
+		"""
+		The number of games recorded, including earlier recordings
+		"""
+		return self._games
+	
+	def record(self, game:DnBTracker, player:int, horizontal:bool, row:int,
+			col:int):
+		"""
+		Records a move. Must be called before the move is applied to game.
+		"""
+		assert game.n == self._n, \
+			f'The recorder is for n={self._n}, not n={game.n}!'
+		r = self._buffer[self._moves]
+		r['hlines'] = game._hlines
+		r['vlines'] = game._vlines
+		r['boxes'] = game._boxes
+		r['player'] = player
+		r['horizontal'] = horizontal
+		r['row'] = row
+		r['col'] = col
+		self._moves += 1
+	
+	def end_game(self, game:DnBTracker):
+		"""
+		Back-fills the outcome of the game and writes its moves to the shards
+		"""
+		rows = self._buffer[:self._moves]
+		self._moves = 0
+		if not len(rows):
+			return
+		margin = game.points[0] - game.points[1]
+		rows['game'] = self._games
+		rows['outcome'] = np.sign(
+			np.where(rows['player'] == 0, margin, -margin))
+		self._games += 1
+		
+		while len(rows):
+			if self._shard is None or self._rows == self._shard_size:
+				self._next_shard()
+			n_rows = min(len(rows), self._shard_size - self._rows)
+			self._shard[self._rows:self._rows+n_rows] = rows[:n_rows]
+			self._rows += n_rows
+			rows = rows[n_rows:]
+	
+	def _next_shard(self):
+		if self._shard is not None:
+			self.flush()
+		name = f'shard-{len(self._manifest["shards"]):05d}.npy'
+		self._shard = np.lib.format.open_memmap(
+			os.path.join(self._directory, name), mode='w+', dtype=self._dtype,
+			shape=(self._shard_size,))
+		self._rows = 0
+		self._manifest['shards'].append({'file': name, 'rows': 0})
+	
+	def flush(self):
+		"""
+		Writes the current shard and the manifest to disk. Readers only see
+		the rows that have been flushed.
+		"""
+		if self._shard is None:
+			return
+		self._shard.flush()
+		self._manifest['shards'][-1]['rows'] = self._rows
+		self._manifest['games'] = self._games
+		path = os.path.join(self._directory, MANIFEST)
+		with open(f'{path}.tmp', 'w') as f:
+			json.dump(self._manifest, f)
+		os.replace(f'{path}.tmp', path)
+	
+	def close(self):
+		self.flush()
+		self._shard = None
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, *exc):
+		self.close()
+
+def read_manifest(directory:str)->dict:
+	with open(os.path.join(directory, MANIFEST)) as f:
+		manifest = json.load(f)
+	assert manifest['version'] == _MANIFEST_VERSION, \
+		f'Unsupported manifest version {manifest["version"]}!'
+	return manifest
+
+def read_shards(directory:str)->List[np.ndarray]:
+	"""
+	Maps every shard of a recording into memory without copying it
+	returns:
+		List[np.ndarray] - One structured array (see row_dtype) per shard,
+			holding only the rows that were written
+	"""
+	manifest = read_manifest(directory)
+	return [np.load(os.path.join(directory, shard['file']),
+			mmap_mode='r')[:shard['rows']]
+		for shard in manifest['shards'] if shard['rows']]
\ No newline at end of file
@@ -1,11 +1,17 @@
+import struct
 from collections import namedtuple
 
 import numpy as np
 
-from colosseum.games import GameTracker
+from colosseum.games import Bool, GameTracker, Int, MoveSchema
 
 Move = namedtuple('Move', ['player', 'horizontal', 'row', 'col'])
 
+# version, n, moves, turn, points, latest move (player is -1 if there is none),
+# forfeited players
+_SNAPSHOT_HEADER = struct.Struct('<BHIBII b?HH B')
+_SNAPSHOT_VERSION = 1
+
 class ImmutableArray:
 	"""
 	A wrapper for a numpy array that exposes acceesses but not modifications.
@@ -36,6 +42,14 @@ class ImmutableArray:
 
 
 class DnBTracker(GameTracker):
+	# hlines has n rows of n-1 lines and vlines n-1 rows of n lines
+	move_schema = MoveSchema(
+		Bool('horizontal'),
+		Int('row', 0, 'self._n - (not horizontal)', fmt='H'),
+		Int('col', 0, 'self._n - horizontal', fmt='H'),
+		check='not (self._hlines if horizontal else self._vlines)[row, col]',
+	)
+	
 	def __init__(self, playerid:int=-1, n:int=5, **kwargs):
 		super().__init__(n_players=2)
 		"""
@@ -79,7 +93,7 @@ class DnBTracker(GameTracker):
 	
 	@property
 	def is_done(self)->bool:
-		return self._moves >= 2*(self._n-1)*(self._n-2)
+		return bool(self._forfeited) or self._moves >= 2*self._n*(self._n-1)
 	
 	@property
 	def hlines(self)->ImmutableArray:
@@ -112,7 +126,7 @@ class DnBTracker(GameTracker):
 		"""
 		Returns the number of edges left to capture (row, col).
 		"""
-		if not (0 <= row <= self._n-1 and 0 <= col <= self._n-1):
+		if not (0 <= row < self._n-1 and 0 <= col < self._n-1):
 			return -1
 		return 4 - (self._hlines[row][col] + self._hlines[row+1][col]
 			+ self._vlines[row][col] + self._vlines[row][col+1])
@@ -121,37 +135,17 @@ class DnBTracker(GameTracker):
 		"""
 		Returns True if the move is valid
 		"""
-		# Check bounds
-		if horizontal:
-			if not (0 <= row < self._n-1) or not (0 <= col < self._n):
-				return False
-		else:
-			if not (0 <= row < self._n) or not (0 <= col < self._n-1):
-				return False
-		
-		a = self._hlines if horizontal else self._vlines
-		return 1-a[row][col]
-	
-	def make_move(self, horizontal:bool, row:int, col:int):
-		"""
-		params:
-			horizontal:bool - True if the move is a horizontal line
-			row:int, col:int - The position of the move
-		"""
-		assert self.check_move(horizontal, row, col), \
-			f'The move {"h" if horizontal else "v"}{row},{col} is invalid!'
-		return {'horizontal': horizontal, 'row':row, 'col':col}
+		return self.move_schema.decode(self, 
+			{'horizontal': horizontal, 'row': row, 'col': col}) is not None
 	
 	def update(self, player:int, horizontal:bool, row:int, col:int):
 		"""
 		params:
 			player:int - The id of the player that made the move
 			horizontal:bool - True if the move was horizontal
-			row:int, col:int - The position of the move
+			row:int, col:int - The position of the move. The move must already
+				have been validated (see move_schema). 
 		"""
-		assert self.check_move(horizontal, row, col), \
-			f'The move {"h" if horizontal else "v"}{row} {col} is invalid!'
-		
 		a = self._hlines if horizontal else self._vlines
 		a[row][col] = 1
 		
@@ -175,6 +169,48 @@ class DnBTracker(GameTracker):
 		self._moves += 1
 		self._latest_move = Move(player, horizontal, row, col)
 	
+	def snapshot(self)->bytes:
+		"""
+		The header is followed by the bit-packed hlines and vlines and then 
+		the boxes as one signed byte each. 
+		"""
+		latest = self._latest_move or Move(-1, False, 0, 0)
+		header = _SNAPSHOT_HEADER.pack(_SNAPSHOT_VERSION, self._n, 
+			self._moves, self._turn, *self.points, *latest, 
+			self._pack_forfeited()[0])
+		return b''.join([header, np.packbits(self._hlines).tobytes(), 
+			np.packbits(self._vlines).tobytes(), 
+			self._boxes.astype(np.int8).tobytes()])
+	
+	def restore(self, data:bytes)->'DnBTracker':
+		version, n, moves, turn, p0, p1, player, horizontal, row, col, \
+			forfeited = _SNAPSHOT_HEADER.unpack_from(data)
+		assert version == _SNAPSHOT_VERSION, \
+			f'Unsupported snapshot version {version}!'
+		
+		n_lines = n*(n-1)
+		offset = _SNAPSHOT_HEADER.size
+		def unpack_lines(offset, shape):
+			n_bytes = (n_lines+7)//8
+			bits = np.frombuffer(data, np.uint8, n_bytes, offset)
+			lines = np.unpackbits(bits, count=n_lines).astype(np.int32)
+			return lines.reshape(shape), offset + n_bytes
+		hlines, offset = unpack_lines(offset, (n, n-1))
+		vlines, offset = unpack_lines(offset, (n-1, n))
+		boxes = np.frombuffer(data, np.int8, (n-1)**2, offset)
+		
+		self._n = n
+		self._hlines = hlines
+		self._vlines = vlines
+		self._boxes = boxes.astype(np.int32).reshape((n-1, n-1))
+		self._moves = moves
+		self._turn = turn
+		self.points = [p0, p1]
+		self._latest_move = Move(player, horizontal, row, col) \
+			if player >= 0 else None
+		self._unpack_forfeited(bytes([forfeited]))
+		return self
+	
 	def render(self)->str:
 		"""
 		Renders a string representation of the board for printing
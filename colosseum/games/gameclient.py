@@ -1,23 +1,112 @@
 import os
+import signal
 import sys
+import threading
+import weakref
 from abc import ABC
+from collections import deque
+from base64 import b64encode
+from itertools import count
+from numbers import Number
+from time import perf_counter, sleep, time
+from typing import Dict, Hashable, Iterable, List
 
-from colosseum.ipc import FileNoComs
+from colosseum.ipc import FileNoComs, ProcessDiedException, TimeoutException
+from .gametracker import GameTracker
+from .profiling import decode_stats
+from .store import STORE_ENV, STORE_SIZE_ENV
+from .usage import MEMORY_EXIT_CODE, Usage, apply_limits, extend_cpu_limit, \
+	read_usage, reset_peak_rss, wait
 
 class GameClient(ABC):
 	"""
 	Handles host-bot communications.
+	
+	If the bot process dies or fails to respond in time, the client is marked
+	as dead. A dead client answers every turn with an empty (and therefore
+	invalid) move so that the hoster forfeits it, and ignores updates. The bot
+	is respawned at the start of the next game. If it keeps dying, it sits out
+	exponentially more games (forfeiting them) before every respawn.
+	
+	The bot process can be confined with resource limits. Exceeding them kills
+	the bot, which therefore forfeits the game. The CPU time and peak memory 
+	of the bot are sampled for every game. 
+	
+	One bot process can play several games at once through sessions (see 
+	session()). Every message is then tagged with the session's game id. 
 	"""
-	def __init__(self, bot_module:str):
+	# Commands the bot may attach to any message
+	_HANDLERS = ('pong', 'profile_data')
+	
+	def __init__(self, bot_module:str, turn_timeout:Number=0,
+			max_backoff:int=64, max_memory:int=None, max_cpu:Number=None, 
+			max_files:int=None, store_dir:str=None, store_size:int=None, 
+			report_failures:bool=True):
 		"""
 		params:
 			bot_module:str - A string representing the arguments to pass to the
-				interpreter call. 
+				interpreter call.
 				i.e. `python3 -m <bot_module>`
+			turn_timeout:Number=0 - Seconds the bot is given to respond to a
+				turn before it is considered hung and killed. 0 to wait forever.
+			max_backoff:int=64 - The most games the bot sits out before it is
+				respawned
+			max_memory:int=None - Address space limit of the bot in bytes
+			max_cpu:Number=None - CPU seconds the bot may use per game
+			max_files:int=None - Limit on the bot's open file descriptors
+			store_dir:str=None - The directory the bot may keep its persistent
+				store in (see Bot.store). Without it, the store only lasts as
+				long as the bot process. 
+			store_size:int=None - The size of the store in bytes. Defaults to 
+				16MiB
+			report_failures:bool=True - If True, every time the bot dies a 
+				line is printed to stderr. Failures are counted either way 
+				(see restarts, last_failure and colosseum.metrics). 
 		"""
 		self._points = 0
 		self._bot_module = bot_module
+		self._turn_timeout = turn_timeout
+		self._max_backoff = max_backoff
+		self._limits = {'max_memory': max_memory, 'max_cpu': max_cpu, 
+			'max_files': max_files}
+		self._store_dir = store_dir
+		self._store_size = store_size
+		self._report_failures = report_failures
 		
+		self._is_parent = True
+		self._lock = threading.RLock()
+		self._gids = count()
+		self.opponents:List[str] = None
+		self._game_params = {}
+		self._coms = None
+		self._pid = None
+		self._restarts = 0
+		self._failures = 0
+		self._backoff = 0
+		self._sit_out = 0
+		self._last_failure = None
+		self._violations = 0
+		# The CPU time of the bot process when each game in progress started
+		self._cpu_start:Dict[Hashable, Number] = {}
+		# The resources used during the last game of each game id
+		self._usage:Dict[Hashable, Usage] = {}
+		self._last_gid = None
+		self._final_usage = None
+		self._spawned_at = None
+		self._startup_time = None
+		self._wants_updates = True
+		self._profiles = []
+		self._turns = 0
+		self._turn_time = 0
+		# Only the recent latencies are kept for the quantiles
+		self._latencies = deque(maxlen=1024)
+		
+		self._spawn()
+	
+	def _spawn(self):
+		"""
+		Fork and exec a new bot process.
+		"""
 		parent_read, child_write = os.pipe()
 		child_read, parent_write = os.pipe()
 		pid = os.fork()
@@ -25,6 +114,7 @@ class GameClient(ABC):
 		if pid:
 			# We are the parent
 			self._is_parent = True
+			self._pid = pid
 			os.close(child_write)
 			os.close(child_read)
 			
@@ -33,42 +123,521 @@ class GameClient(ABC):
 				read_fileno=parent_read,
 				write_fileno=parent_write
 			)
+			# The bot answers the ping as soon as it is ready. The pong is 
+			# handled whenever it arrives so that bots start up in parallel.
+			self._spawned_at = time()
+			self._startup_time = None
+			# A new process starts from zero CPU time
+			self._cpu_start = dict.fromkeys(self._cpu_start, 0)
+			self._wants_updates = True
+			self._register('pong', self._pong)
+			self._register('profile_data', self._profile_data)
+			self._send(ping={})
 		else:
 			# We are the child
 			self._is_parent = False
 			os.close(parent_read)
 			os.close(parent_write)
 			
-			os.dup2(child_read, sys.stdin.fileno())
-			os.dup2(child_write, sys.stdout.fileno())
+			# The bot talks over fds 0 and 1 even if sys.stdin and sys.stdout 
+			# have been replaced in this process (i.e. by multiprocessing)
+			os.dup2(child_read, 0)
+			os.dup2(child_write, 1)
 			
-			os.execlp('python3', 'Bot', '-m', self._bot_module)
+			try:
+				apply_limits(**self._limits)
+				if self._store_dir is not None:
+					os.environ[STORE_ENV] = os.path.join(self._store_dir, 
+						self._bot_module)
+				if self._store_size is not None:
+					os.environ[STORE_SIZE_ENV] = str(self._store_size)
+				os.execlp('python3', 'Bot', '-m', self._bot_module)
+			finally:
+				os._exit(1)
+	
+	def _reap(self, grace:Number=0)->int:
+		"""
+		Close the communication and collect the bot process.
+		params:
+			grace:Number=0 - Seconds the process is given to exit on its own
+				before it is killed
+		returns:
+			int - The wait status of the process, None if it was already 
+				collected
+		"""
+		if self._coms is not None:
+			for command in self._HANDLERS:
+				self._coms.deregister(command)
+			try:
+				self._coms.close()
+			except (OSError, ValueError):
+				pass
+			self._coms = None
+		if self._pid is None:
+			return None
+		deadline = time() + grace
+		status = None
+		try:
+			pid, status, usage = wait(self._pid, os.WNOHANG)
+			while not pid:
+				if time() >= deadline:
+					os.kill(self._pid, signal.SIGKILL)
+					options = 0
+				else:
+					sleep(0.01)
+					options = os.WNOHANG
+				pid, status, usage = wait(self._pid, options)
+			self._final_usage = usage
+		except (ChildProcessError, ProcessLookupError):
+			pass
+		self._pid = None
+		return status
+	
+	def _died(self, reason:str):
+		"""
+		Mark the bot as dead and schedule the respawn.
+		"""
+		status = self._reap()
+		if status is not None:
+			if os.WIFSIGNALED(status) and \
+					os.WTERMSIG(status) == signal.SIGXCPU:
+				reason = 'exceeded its CPU limit'
+			elif os.WIFEXITED(status) and \
+					os.WEXITSTATUS(status) == MEMORY_EXIT_CODE:
+				reason = 'exceeded its memory limit'
+		if reason.startswith('exceeded'):
+			self._violations += 1
+		self._failures += 1
+		self._backoff = min(2**(self._failures-1) - 1, self._max_backoff)
+		self._sit_out = self._backoff
+		self._last_failure = reason
+		if self._report_failures:
+			print(f'Bot {self._bot_module} {reason}; respawning after '
+				f'{self._backoff} game(s) (restart #{self._restarts+1})',
+				file=sys.stderr)
+	
+	def _send(self, **kwargs):
+		self._send_encoded(FileNoComs.encode(**kwargs))
+	
+	def _send_encoded(self, data:bytes):
+		if not self.is_alive:
+			return
+		try:
+			self._coms.send_encoded(data)
+		except OSError:
+			self._died('closed its pipe')
+	
+	def _pong(self, ready_at:float, updates:bool=True):
+		self._startup_time = ready_at - self._spawned_at
+		self._wants_updates = updates
+	
+	def _profile_data(self, stats:list):
+		try:
+			self._profiles.append(decode_stats(stats))
+		except (TypeError, ValueError, IndexError):
+			print(f'Bot {self._bot_module} sent malformed profiling data', 
+				file=sys.stderr)
+	
+	def _register(self, command:str, handler):
+		"""
+		Registers a handler on the coms through a weak reference. The coms 
+		would otherwise keep the client alive, and a dropped client would no 
+		longer stop its bot until the garbage collector found the cycle. 
+		"""
+		method = weakref.WeakMethod(handler)
+		def call(*args, **kwargs):
+			handler = method()
+			if handler is not None:
+				handler(*args, **kwargs)
+		self._coms.register(command, call)
 	
 	def _kill_child(self):
 		"""
-		Kill the bot process and close the communication. 
+		Kill the bot process and close the communication.
 		"""
-		self._coms.send(**{'stop': {}})
-		self._coms.close()
+		if self._coms is not None:
+			try:
+				self._coms.send(stop={})
+			except (OSError, ValueError):
+				# The bot is already gone (or the coms were already finalized)
+				pass
+		self._reap(grace=1)
 	
-	def take_turn(self)->dict:
+	@property
+	def bot_module(self)->str:
+		return self._bot_module
+	
+	@property
+	def pid(self)->int:
 		"""
-		Signal the bot to take their turn and return their response
+		The pid of the bot process, None while it is dead
 		"""
-		self._coms.send(**{'your_turn': {}})
-		return self._coms.recv()
+		return self._pid
 	
-	def update(self, *args, **kwargs):
+	@property
+	def client(self)->'GameClient':
 		"""
-		Update the bot to a new gamestate. Called when a bot makes their move. 
+		The client that owns the bot process, self (see GameSession.client)
 		"""
-		self._coms.send(**{'update': kwargs})
+		return self
 	
-	def new_game(self, game_params):
+	@property
+	def turns(self)->int:
+		"""
+		The number of turns the bot has been asked to take
+		"""
+		return self._turns
+	
+	@property
+	def turn_time(self)->float:
+		"""
+		Total seconds spent waiting on the bot's turns
+		"""
+		return self._turn_time
+	
+	@property
+	def latencies(self)->List[float]:
 		"""
-		Signal the bot that a new game has started. 
+		The durations (seconds) of the most recent turns
 		"""
-		self._coms.send(new_game=game_params)
+		return list(self._latencies)
+	
+	@property
+	def is_alive(self)->bool:
+		return self._coms is not None
+	
+	@property
+	def restarts(self)->int:
+		"""
+		The number of times the bot process has been respawned
+		"""
+		return self._restarts
+	
+	@property
+	def backoff(self)->int:
+		"""
+		The number of games the bot sat out after it last died
+		"""
+		return self._backoff
+	
+	@property
+	def violations(self)->int:
+		"""
+		The number of times the bot was killed for exceeding a resource limit
+		"""
+		return self._violations
+	
+	@property
+	def usage(self)->Usage:
+		"""
+		The resources used by the bot during the last game. Sessions report 
+		their own games (see GameSession.usage). 
+		"""
+		return self.usage_of(self._last_gid)
+	
+	def usage_of(self, gid:Hashable)->Usage:
+		"""
+		The resources used by the bot during the last game with the given id
+		"""
+		return self._usage.get(gid, Usage(0, 0))
+	
+	@property
+	def profiles(self)->List[dict]:
+		"""
+		The pstats dictionaries the bot has sent back, one per profile()
+		"""
+		return self._profiles
+	
+	def profile(self, turns:int=1):
+		"""
+		Asks the bot to run cProfile over its next turns. The stats arrive 
+		with the response to the last profiled turn and are added to 
+		self.profiles. 
+		params:
+			turns:int=1 - The number of turns to profile
+		"""
+		with self._lock:
+			self._send(profile={'turns': turns})
+	
+	@property
+	def startup_time(self)->float:
+		"""
+		Seconds between spawning the bot process and it being ready to play, 
+		None until the bot has been heard from
+		"""
+		return self._startup_time
+	
+	@property
+	def last_failure(self)->str:
+		"""
+		The reason the bot last died, None if it never has
+		"""
+		return self._last_failure
+	
+	def wait_ready(self, timeout:Number=0)->float:
+		"""
+		Blocks until the bot has finished starting up. 
+		returns:
+			float - The startup time, None if the bot died first
+		"""
+		with self._lock:
+			if self._startup_time is None and self.is_alive:
+				self._coms.deregister('pong')
+				try:
+					msg = self._coms.recv(timeout=timeout)
+					pong = msg['pong']
+					self._pong(*pong.get('args', []), **pong.get('kwargs', {}))
+				except (ProcessDiedException, TimeoutException, KeyError, 
+						TypeError, ValueError):
+					self._died('did not start up')
+				finally:
+					if self.is_alive:
+						self._register('pong', self._pong)
+		return self._startup_time
+	
+	def session(self)->'GameSession':
+		"""
+		Returns a new session which plays its games in this bot process
+		alongside any other sessions. 
+		"""
+		return GameSession(self, next(self._gids))
+	
+	def take_turn(self, gid:Hashable=None)->dict:
+		"""
+		Signal the bot to take their turn and return their response. If the
+		bot is dead or dies during its turn, an empty response is returned.
+		params:
+			gid:Hashable=None - The game to take the turn in
+		"""
+		with self._lock:
+			start = perf_counter()
+			response = self._take_turn(gid)
+			latency = perf_counter() - start
+		self._turns += 1
+		self._turn_time += latency
+		self._latencies.append(latency)
+		return response
+	
+	def _take_turn(self, gid:Hashable)->dict:
+		self._send(your_turn={} if gid is None else {'gid': gid})
+		if not self.is_alive:
+			return {}
+		try:
+			response = self._coms.recv(timeout=self._turn_timeout)
+		except ProcessDiedException:
+			self._died('died')
+			return {}
+		except TimeoutException:
+			self._died('timed out')
+			return {}
+		except ValueError:
+			self._died('sent a malformed message')
+			return {}
+		
+		if self._limits['max_cpu'] is not None:
+			usage = read_usage(self._pid)
+			if usage is not None and usage.cpu > self._cpu_budget():
+				self._died('exceeded its CPU limit')
+				return {}
+		self._failures = 0
+		if response.pop('gid', None) != gid:
+			return {}
+		return response
+	
+	def update(self, *args, gid:Hashable=None, **kwargs):
+		"""
+		Update the bot to a new gamestate. Called when a bot makes their move.
+		To send the same update to several bots, use broadcast instead. 
+		"""
+		self._update({}, kwargs, gid)
+	
+	@staticmethod
+	def broadcast(players:Iterable['GameClient'], **kwargs):
+		"""
+		Sends the same update to every player. The update is serialized once 
+		(once per game id when sessions are involved) and the bytes are 
+		written straight to every pipe. Bots that opted out of updates are 
+		skipped. 
+		params:
+			players:Iterable[GameClient] - GameClients or GameSessions
+			**kwargs - The update
+		"""
+		encoded = {}
+		for p in players:
+			p._update(encoded, kwargs)
+	
+	def _update(self, encoded:dict, update:dict, gid:Hashable=None):
+		"""
+		params:
+			encoded:dict - Cache of the serialized update by game id
+			update:dict - The update
+			gid:Hashable=None - The id of the game
+		"""
+		if not self._wants_updates:
+			return
+		data = encoded.get(gid, None)
+		if data is None:
+			if gid is not None:
+				update = dict(update, gid=gid)
+			data = encoded[gid] = FileNoComs.encode(update=update)
+		with self._lock:
+			self._send_encoded(data)
+	
+	def new_game(self, game_params, gid:Hashable=None, 
+			opponents:List[str]=None):
+		"""
+		Signal the bot that a new game has started. Respawns the bot first if
+		it has died and has sat out its backoff.
+		params:
+			game_params - Passed to the bot's GameTracker
+			gid:Hashable=None - The id of the game
+			opponents:List[str]=None - The bot modules of the other players. 
+				Defaults to self.opponents
+		"""
+		game_params = dict(game_params)
+		if gid is not None:
+			game_params['gid'] = gid
+		opponents = self.opponents if opponents is None else opponents
+		if opponents is not None:
+			game_params['opponents'] = opponents
+		with self._lock:
+			self._game_params[gid] = game_params
+			self._new_game(game_params, gid)
+	
+	def resync(self, game:GameTracker, gid:Hashable=None):
+		"""
+		Brings the bot up to date with the current state of a game in one 
+		message instead of replaying every update. Use this after the bot has 
+		been respawned mid-game (it is respawned here if it is dead and has 
+		sat out its backoff) or when it joins a game late. 
+		params:
+			game:GameTracker - The host's tracker of the game
+			gid:Hashable=None - The id of the game. new_game must have been 
+				called with it before. 
+		"""
+		with self._lock:
+			if not self.is_alive and not self._sit_out:
+				self._restarts += 1
+				self._spawn()
+			snapshot = b64encode(game.snapshot()).decode('ascii')
+			self._send(resync=dict(self._game_params[gid], snapshot=snapshot))
+	
+	def _cpu_budget(self)->Number:
+		"""
+		The CPU time the bot process may reach before it is killed. Every game
+		in progress adds max_cpu to the budget, counted from the start of the 
+		oldest one, since the CPU time of a process playing several games at 
+		once cannot be told apart. 
+		"""
+		if not self._cpu_start:
+			return float('inf')
+		return min(self._cpu_start.values()) + \
+			self._limits['max_cpu']*len(self._cpu_start)
+	
+	def _limit_cpu(self):
+		if self.is_alive and self._limits['max_cpu'] is not None and \
+				self._cpu_start:
+			extend_cpu_limit(self._pid, self._cpu_budget(), since=0)
+	
+	def _new_game(self, game_params, gid:Hashable=None):
+		if not self.is_alive:
+			if self._sit_out:
+				self._sit_out -= 1
+			else:
+				self._restarts += 1
+				self._spawn()
+		
+		self._final_usage = None
+		self._cpu_start.pop(gid, None)
+		if self.is_alive:
+			usage = read_usage(self._pid)
+			# The peak RSS belongs to the whole process, so it is only reset 
+			# if no other game is using it
+			if not self._cpu_start:
+				reset_peak_rss(self._pid)
+			self._cpu_start[gid] = usage.cpu if usage is not None else 0
+			self._limit_cpu()
+		self._send(new_game=game_params)
+	
+	def end_game(self, gid:Hashable=None):
+		"""
+		Called by the hoster once the game is over. Lets the bot know (so 
+		that it can flush its store) and samples the resources used by the 
+		bot during the game. When the bot plays several games at once, the 
+		CPU time of a game includes whatever the others used meanwhile and the
+		peak RSS is that of the whole process. 
+		params:
+			gid:Hashable=None - The id of the game
+		"""
+		with self._lock:
+			usage = read_usage(self._pid) if self.is_alive else \
+				self._final_usage
+			cpu_start = self._cpu_start.pop(gid, 0)
+			self._usage[gid] = Usage(0, 0) if usage is None else \
+				Usage(max(usage.cpu - cpu_start, 0), usage.rss)
+			self._last_gid = gid
+			self._limit_cpu()
+			if self.is_alive:
+				self._send(end_game={'gid': gid})
 	
 	def __del__(self):
-		self._kill_child()
\ No newline at end of file
+		if self._is_parent:
+			self._kill_child()
+
+class GameSession:
+	"""
+	A view of a GameClient that tags every message with its own game id so 
+	that several hosters can share one bot process. Calls from different 
+	threads are serialized per turn. 
+	"""
+	def __init__(self, client:GameClient, gid:Hashable):
+		"""
+		params:
+			client:GameClient - The client that owns the bot process
+			gid:Hashable - The game id of this session
+		"""
+		self._client = client
+		self._gid = gid
+		self.opponents:List[str] = None
+	
+	@property
+	def gid(self)->Hashable:
+		return self._gid
+	
+	@property
+	def client(self)->GameClient:
+		"""
+		The client that owns the bot process. Its counters (turns, restarts, 
+		...) cover every session sharing it. 
+		"""
+		return self._client
+	
+	def take_turn(self)->dict:
+		return self._client.take_turn(gid=self._gid)
+	
+	def update(self, *args, **kwargs):
+		self._client.update(*args, gid=self._gid, **kwargs)
+	
+	def _update(self, encoded:dict, update:dict):
+		self._client._update(encoded, update, gid=self._gid)
+	
+	def new_game(self, game_params):
+		self._client.new_game(game_params, gid=self._gid, 
+			opponents=self.opponents)
+	
+	def resync(self, game:GameTracker):
+		self._client.resync(game, gid=self._gid)
+	
+	def end_game(self):
+		self._client.end_game(gid=self._gid)
+	
+	@property
+	def usage(self)->Usage:
+		"""
+		The resources used by the bot during this session's last game
+		"""
+		return self._client.usage_of(self._gid)
+	
+	def __getattr__(self, name):
+		# Everything else (usage, restarts, ...) belongs to the bot process
+		return getattr(self._client, name)
\ No newline at end of file
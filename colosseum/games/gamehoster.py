@@ -1,54 +1,188 @@
 import random
 from abc import ABC, abstractmethod
-from typing import List
+from collections import defaultdict
+from typing import List, Union
 
 from .gameclient import GameClient
 from .gametracker import GameTracker
+from .profiling import format_stats, merge_stats
 
 class GameHoster(ABC):
 	"""
 	Hosts a game and manages the bots.
 	"""
-	def __init__(self, player_modules:List[str], shuffle_players=True):
+	def __init__(self, player_modules:List[Union[str, GameClient]], 
+			shuffle_players=True, spectator=None, **client_params):
 		"""
 		params:
-			player_modules:List[str] - A list of strings representing the 
-				arguments to pass to the interpreter calls. 
+			player_modules:List[Union[str, GameClient]] - A list of strings 
+				representing the arguments to pass to the interpreter calls. 
 				i.e. `python3 -m <bot_module>`
+				A running GameClient may be given instead, in which case the 
+				bot process is shared with whoever else is using it.
 			shuffle_players=True - If True, the player order will be shuffled 
 				every time a new game is started. 
+			spectator:Spectator=None - If given, every move is pushed to the 
+				spectator (see colosseum.spectator)
+			**client_params - Passed to every GameClient. i.e. turn_timeout
 		"""
-		self._players = ShuffledList(GameClient(pm)
+		self._players = ShuffledList(
+			GameClient(pm, **client_params) if isinstance(pm, str) 
+				else pm.session()
 			for pm in player_modules)
+		modules = [p.bot_module for p in self._players]
+		for i, p in enumerate(self._players):
+			p.opponents = modules[:i] + modules[i+1:]
 		self._total_points = [0 for p in self._players]
+		self._forfeits = [0 for p in self._players]
+		self._total_cpu = [0 for p in self._players]
+		self._peak_rss = [0 for p in self._players]
 		self._shuffle_players = shuffle_players
+		self._spectator = spectator
 		self._n_games = 0
+		self._last_game = None
 	
-	def start_game(self, *args, **kwargs):
+	def start_game(self, *args, **kwargs)->List[int]:
+		"""
+		Plays a single game and adds the results to the running totals. 
+		returns:
+			List[int] - The points each player earned this game in the 
+				original player order
+		"""
 		if self._shuffle_players:
 			self._players.shuffle
 		tracker = self.play(*args, **kwargs)
+		self._last_game = tracker
+		for p in self._players:
+			p.end_game()
 		
 		points = ShuffledList(tracker.points, self._players.mapping)
 		self._players.unshuffle
 		points.unshuffle
+		points = list(points)
 		for i, s in enumerate(points):
 			self._total_points[i] += s
+		for i in tracker.forfeited:
+			self._forfeits[self._players.mapping[i]] += 1
+		for i, p in enumerate(self._players):
+			self._total_cpu[i] += p.usage.cpu
+			self._peak_rss[i] = max(self._peak_rss[i], p.usage.rss)
 		
 		self._n_games += 1
+		return points
 	
 	@property
 	def n_games(self):
 		return self._n_games
 	
+	@property
+	def last_game(self)->GameTracker:
+		"""
+		The GameTracker of the most recently played game
+		"""
+		return self._last_game
+	
 	@property
 	def total_points(self):
 		return self._total_points
 	
+	@property
+	def players(self)->List[GameClient]:
+		"""
+		The GameClients (or GameSessions) of the players
+		"""
+		return list(self._players)
+	
+	@property
+	def forfeits(self)->List[int]:
+		"""
+		The number of games each player has forfeited
+		"""
+		return self._forfeits
+	
+	@property
+	def restarts(self)->List[int]:
+		"""
+		The number of times each player's bot process has been respawned
+		"""
+		return [p.restarts for p in self._players]
+	
+	@property
+	def startup_times(self)->List[float]:
+		"""
+		Seconds each player's bot process took to start up (most recent spawn)
+		"""
+		return [p.startup_time for p in self._players]
+	
+	@property
+	def violations(self)->List[int]:
+		"""
+		The number of times each player was killed for exceeding a resource 
+		limit. Every violation is a forfeited game. 
+		"""
+		return [p.violations for p in self._players]
+	
+	@property
+	def total_cpu(self)->List[float]:
+		"""
+		CPU seconds used by each player across all games
+		"""
+		return self._total_cpu
+	
+	@property
+	def peak_rss(self)->List[int]:
+		"""
+		The largest resident set size (bytes) of each player in any game
+		"""
+		return self._peak_rss
+	
 	@property
 	def avg_points(self):
 		return [s/self._n_games for s in self._total_points]
 	
+	def profile(self, turns:int=1, players:List[int]=None):
+		"""
+		Asks bots to profile their next turns (see GameClient.profile)
+		params:
+			turns:int=1 - The number of turns to profile
+			players:List[int]=None - The indices of the players to profile. 
+				Defaults to every player. 
+		"""
+		if players is None:
+			players = range(len(self._players))
+		for i in players:
+			self._players[i].profile(turns)
+	
+	def profile_report(self, top:int=30, sort:str='cumulative')->str:
+		"""
+		Merges the profiles of every bot module and renders them as text. 
+		Players that run the same module are merged together. 
+		"""
+		by_module = defaultdict(list)
+		for p in self._players:
+			by_module[p.bot_module].extend(p.profiles)
+		report = []
+		for module, profiles in by_module.items():
+			if not profiles:
+				continue
+			report.append(f'== {module} ({len(profiles)} profile(s))')
+			report.append(format_stats(merge_stats(profiles), top, sort))
+		return '\n'.join(report)
+	
+	def _spectate(self, game:GameTracker, event:dict=None):
+		"""
+		Pushes the game to the spectator, if there is one. Called at the start
+		of the game (event=None) and after every move. 
+		"""
+		if self._spectator is not None:
+			self._spectator.push(self._n_games, game, event)
+	
+	def _broadcast(self, **kwargs):
+		"""
+		Updates all players to the new gamestate. Called after every move. 
+		"""
+		GameClient.broadcast(self._players, **kwargs)
+	
 	@abstractmethod
 	def play(self, *args, **kwargs)->GameTracker:
 		...
@@ -1,13 +1,93 @@
 from abc import ABC, abstractmethod
 
+from .schema import MoveSchema
+
 class GameTracker(ABC):
+	# Declares the fields of a move (see colosseum.games.schema). Trackers 
+	# with a schema get make_move and decode_move for free. 
+	move_schema:MoveSchema = None
+	
 	def __init__(self, n_players, points=None):
 		self._n_players = n_players
 		self.points = points or [0 for _ in range(n_players)]
+		self._forfeited = set()
+	
+	def forfeit(self, player:int):
+		"""
+		Removes a player from the game. A forfeiting player scores no points.
+		"""
+		self._forfeited.add(player)
+		self.points[player] = 0
+	
+	@property
+	def forfeited(self)->set:
+		"""
+		The ids of the players that have forfeited
+		"""
+		return self._forfeited
+	
+	def snapshot(self)->bytes:
+		"""
+		Packs the shared game state into a compact binary form. Everything 
+		needed to continue the game is included but the playerid of the 
+		tracker is not, so a snapshot taken by the host can be restored into 
+		a bot's tracker. Snapshots also make cheap checkpoints and log 
+		entries. 
+		"""
+		raise NotImplementedError(
+			f'{type(self).__name__} does not support snapshots')
+	
+	def restore(self, data:bytes)->'GameTracker':
+		"""
+		Overwrites the game state with a snapshot taken by snapshot()
+		returns:
+			GameTracker - self
+		"""
+		raise NotImplementedError(
+			f'{type(self).__name__} does not support snapshots')
+	
+	@classmethod
+	def from_snapshot(cls, data:bytes)->'GameTracker':
+		"""
+		Creates a tracker from a snapshot taken by snapshot(). Trackers whose
+		constructor has required arguments must override this. 
+		"""
+		return cls().restore(data)
+	
+	def _pack_forfeited(self)->bytes:
+		"""
+		Packs the forfeited players into a bitmask of ceil(n_players/8) bytes
+		"""
+		mask = sum(1 << p for p in self._forfeited)
+		return mask.to_bytes((self._n_players+7)//8, 'little')
+	
+	def _unpack_forfeited(self, data:bytes):
+		mask = int.from_bytes(data, 'little')
+		self._forfeited = {p for p in range(self._n_players) if mask >> p & 1}
 	
-	@abstractmethod
 	def make_move(self, *args, **kwargs)->dict:
-		...
+		"""
+		Builds the move to return from Bot.take_turn. The fields of the move 
+		may be given positionally or by name. 
+		raises:
+			InvalidMoveException - If the move is invalid
+		"""
+		if self.move_schema is None:
+			raise NotImplementedError(
+				f'{type(self).__name__} must define move_schema or make_move')
+		return self.move_schema.make(self, *args, **kwargs)
+	
+	def decode_move(self, move:dict)->tuple:
+		"""
+		Validates a move received from a bot. 
+		returns:
+			tuple - The fields of the move in the order declared by the 
+				schema, or None if the move is invalid
+		"""
+		if self.move_schema is None:
+			raise NotImplementedError(
+				f'{type(self).__name__} must define move_schema or decode_move')
+		return self.move_schema.decode(self, move)
 	
 	@abstractmethod
 	def update(self, *args, **kwargs):
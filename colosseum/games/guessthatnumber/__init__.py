@@ -8,5 +8,9 @@ the winner.
 
 __all__ = ['GTNTracker', 'GTNHoster']
 
-from .hoster import GTNHoster
-from .tracker import GTNTracker
\ No newline at end of file
+from colosseum.lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+	'GTNTracker': 'tracker',
+	'GTNHoster': 'hoster',
+})
\ No newline at end of file
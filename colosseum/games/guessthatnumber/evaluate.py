@@ -0,0 +1,176 @@
+"""
+Measures how many guesses a GuessThatNumber bot needs by playing it alone 
+against a fixed set of secrets rather than random ones. Small ranges are 
+evaluated exhaustively, so the mean and worst case are exact. Huge ranges are
+evaluated against a stratified sample with one secret drawn from each of 
+equally sized strata. The secrets are sharded over several processes, each 
+running its own copy of the bot. A game the bot does not finish within the 
+guess limit, or in which it times out, counts as a forfeit. 
+
+usage: python3 -m colosseum.games.guessthatnumber.evaluate <bot_module> <upper>
+"""
+
+import argparse
+import os
+import random
+from collections import namedtuple
+from multiprocessing import Pool
+from numbers import Number
+from typing import Iterator
+
+from .hoster import GTNHoster
+
+Evaluation = namedtuple('Evaluation', ['n_secrets', 'exact', 'mean', 'worst',
+	'worst_secret', 'forfeits'])
+Evaluation.__doc__ = """
+The result of an evaluation. 
+	n_secrets - The number of secrets played
+	exact - True if every secret in the range was played and none of the 
+		games was forfeited. Otherwise mean is an estimate and worst is a 
+		lower bound on the true worst case. 
+	mean - Mean number of guesses over the games that were not forfeited
+	worst - The most guesses needed for any secret. A forfeited game counts 
+		as one more guess than the bot made in it. 
+	worst_secret - The secret that needed the most guesses
+	forfeits - The number of games the bot forfeited
+"""
+
+_Shard = namedtuple('_Shard', ['n_games', 'total', 'worst', 'worst_secret', 
+	'forfeits'])
+
+def secrets(lower:int, upper:int, n_samples:int=None, seed=None, shard:int=0,
+		n_shards:int=1)->Iterator[int]:
+	"""
+	Yields the secrets belonging to one shard. 
+	params:
+		lower:int, upper:int - The range of secrets, [lower, upper)
+		n_samples:int=None - If None or at least the size of the range, every 
+			secret is yielded. Otherwise one secret is drawn from each of 
+			n_samples equally sized strata. 
+		seed=None - Seed for the stratified sample. The same seed draws the
+			same secrets for any number of shards. 
+		shard:int=0, n_shards:int=1 - The shard to yield. Shards are 
+			interleaved so that each covers the whole range evenly. 
+	"""
+	width = upper - lower
+	if n_samples is None or n_samples >= width:
+		yield from range(lower + shard, upper, n_shards)
+		return
+	
+	for k in range(shard, n_samples, n_shards):
+		# Every stratum has its own generator so that the sample does not 
+		# depend on how it is sharded
+		rng = random.Random(f'{seed}:{k}')
+		yield rng.randrange(lower + width*k//n_samples, 
+			lower + width*(k+1)//n_samples)
+
+def default_max_guesses(lower:int, upper:int)->int:
+	"""
+	The default guess limit: 64 plus 8 guesses per bit of the range, far more 
+	than a bot that bisects the range needs
+	"""
+	return 64 + 8*(upper - lower).bit_length()
+
+def _run_shard(bot_module:str, lower:int, upper:int, n_samples:int, seed, 
+		shard:int, n_shards:int, max_guesses:int, 
+		turn_timeout:Number)->_Shard:
+	hoster = GTNHoster([bot_module], shuffle_players=False, 
+		turn_timeout=turn_timeout)
+	n_games = total = worst = forfeits = 0
+	worst_secret = None
+	for secret in secrets(lower, upper, n_samples, seed, shard, n_shards):
+		hoster.start_game(upper, lower, secret=secret, 
+			max_guesses=max_guesses)
+		game = hoster.last_game
+		# The bot needs at least one more guess to find a secret it 
+		# forfeited
+		guesses = game.guesses + 1 if game.forfeited else game.guesses
+		if game.forfeited:
+			forfeits += 1
+		else:
+			n_games += 1
+			total += guesses
+		if guesses > worst:
+			worst = guesses
+			worst_secret = secret
+	del hoster
+	return _Shard(n_games, total, worst, worst_secret, forfeits)
+
+def evaluate(bot_module:str, upper:int, lower:int=0, 
+		max_secrets:int=100000, n_shards:int=None, seed=None, 
+		max_guesses:int=None, turn_timeout:Number=1)->Evaluation:
+	"""
+	params:
+		bot_module:str - The bot to evaluate. i.e. `python3 -m <bot_module>`
+		upper:int - Exclusive upper bound of the secret number
+		lower:int=0 - Inclusive lower bound of the secret number
+		max_secrets:int=100000 - Ranges larger than this are sampled
+		n_shards:int=None - The number of processes to use. Defaults to the 
+			number of CPUs. 
+		seed=None - Seed for the stratified sample
+		max_guesses:int=None - The most guesses the bot may make per game 
+			before it forfeits. Defaults to default_max_guesses
+		turn_timeout:Number=1 - The seconds the bot may take per guess 
+			before it forfeits. 0 waits forever. 
+	returns:
+		Evaluation - The aggregated result
+	"""
+	assert upper > lower, f'The range [{lower}, {upper}) is empty!'
+	width = upper - lower
+	exact = width <= max_secrets
+	n_samples = None if exact else max_secrets
+	n_secrets = width if exact else max_secrets
+	n_shards = max(1, min(n_shards or os.cpu_count() or 1, n_secrets))
+	if max_guesses is None:
+		max_guesses = default_max_guesses(lower, upper)
+	
+	args = [(bot_module, lower, upper, n_samples, seed, shard, n_shards, 
+			max_guesses, turn_timeout) 
+		for shard in range(n_shards)]
+	if n_shards == 1:
+		shards = [_run_shard(*args[0])]
+	else:
+		with Pool(n_shards) as pool:
+			shards = pool.starmap(_run_shard, args)
+	
+	n_games = sum(s.n_games for s in shards)
+	worst = max(shards, key=lambda s: s.worst)
+	forfeits = sum(s.forfeits for s in shards)
+	return Evaluation(
+		n_secrets=n_secrets,
+		exact=exact and not forfeits,
+		mean=sum(s.total for s in shards)/n_games if n_games else None,
+		worst=worst.worst,
+		worst_secret=worst.worst_secret,
+		forfeits=forfeits
+	)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(
+		description='Evaluate a GuessThatNumber bot against every secret.')
+	parser.add_argument('bot_module')
+	parser.add_argument('upper', type=int)
+	parser.add_argument('--lower', type=int, default=0)
+	parser.add_argument('--max-secrets', type=int, default=100000)
+	parser.add_argument('--shards', type=int, default=None)
+	parser.add_argument('--seed', default=None)
+	parser.add_argument('--max-guesses', type=int, default=None, 
+		help='guesses per game before the bot forfeits (default: 64 plus 8 '
+		'per bit of the range)')
+	parser.add_argument('--turn-timeout', type=float, default=1, 
+		help='seconds per guess before the bot forfeits, 0 for no limit')
+	args = parser.parse_args()
+	
+	result = evaluate(args.bot_module, args.upper, args.lower, 
+		args.max_secrets, args.shards, args.seed, args.max_guesses, 
+		args.turn_timeout)
+	kind = 'exhaustive' if result.n_secrets == args.upper - args.lower else \
+		'stratified sample'
+	print(f'{result.n_secrets} secrets ({kind})')
+	mean = 'n/a' if result.mean is None else f'{result.mean:0.4f}'
+	if result.forfeits:
+		mean += f' (excluding {result.forfeits} forfeited games)'
+	print(f'mean guesses: {mean}')
+	print(f'worst case:   {result.worst}{"" if result.exact else "+"} '
+		f'guesses (secret {result.worst_secret})')
+	print(f'forfeits:     {result.forfeits}')
\ No newline at end of file
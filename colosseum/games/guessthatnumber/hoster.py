@@ -5,16 +5,27 @@ from .tracker import GTNTracker
 from colosseum.games import GameHoster
 
 class GTNHoster(GameHoster):
-	def play(self, upper:int, lower:int=0)->GTNTracker:
+	def play(self, upper:int, lower:int=0, secret:int=None, 
+			max_guesses:int=None)->GTNTracker:
 		"""
 		params:
 			upper:int - Exclusive upper bound of the secret number
 			lower:int=0 - Inclusive lower bound of the secret number
+			secret:int=None - The secret number. If None, it is drawn 
+				uniformly from [lower, upper)
+			max_guesses:int=None - The most guesses each player may make. A 
+				player whose last allowed guess is wrong forfeits. If None, 
+				players guess until one of them is right. 
 		returns: 
 			GTNTracker - The GameTracker for this game
 		"""
 		game = GTNTracker(len(self._players), upper, lower)
-		secret_num = random.randint(lower, upper)
+		if secret is None:
+			secret_num = random.randrange(lower, upper)
+		else:
+			assert lower <= secret < upper, \
+				f'The secret {secret} is not in [{lower}, {upper})!'
+			secret_num = secret
 		
 		for i, p in enumerate(self._players):
 			p.new_game(
@@ -22,26 +33,36 @@ class GTNHoster(GameHoster):
 				'lower': lower, 'upper': upper}
 			)
 		
-		forfeited = set()
+		self._spectate(game)
+		
+		forfeited = game.forfeited
+		guesses = [0 for _ in self._players]
 		for i, p in cycle(enumerate(self._players)):
 			if i in forfeited:
 				continue
 			response = p.take_turn()
-			guess = response.get('guess', None)
-			if not isinstance(guess, int) or not (lower <= guess < upper):
-				forfeited.add(i)
+			move = game.decode_move(response)
+			if move is None:
+				game.forfeit(i)
 				if len(forfeited) == len(self._players):
 					break
 				continue
-				
+			guess, = move
+			
 			higher = guess < secret_num
 			correct = guess == secret_num
 			
 			game.update(i, guess, higher, correct)
 			self._broadcast(i, guess, higher, correct)
+			self._spectate(game, response)
 			
 			if correct:
 				break
+			guesses[i] += 1
+			if max_guesses is not None and guesses[i] >= max_guesses:
+				game.forfeit(i)
+				if len(forfeited) == len(self._players):
+					break
 		return game
 	
 	def _broadcast(self, player:int, guess:int, higher:int, correct:int):
@@ -53,6 +74,5 @@ class GTNHoster(GameHoster):
 			higher:bool - If True, the true value is higher than the guess
 			correct: - If True, the guess was correct
 		"""
-		for p in self._players:
-			p.update(player=player, guess=guess, higher=higher, 
-				correct=correct)
\ No newline at end of file
+		super()._broadcast(player=player, guess=guess, higher=higher, 
+			correct=correct)
\ No newline at end of file
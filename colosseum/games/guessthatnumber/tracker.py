@@ -1,6 +1,22 @@
-from colosseum.games import GameTracker
+import struct
+
+from colosseum.games import GameTracker, Int, MoveSchema
+
+# version, n_players, guesses, is_done, length of upper, length of lower, 
+# length of the original lower and upper bound
+_SNAPSHOT_HEADER = struct.Struct('<BHI?HHHH')
+_SNAPSHOT_VERSION = 2
+
+def _int_to_bytes(x:int)->bytes:
+	return x.to_bytes((x.bit_length()+8)//8, 'little', signed=True)
 
 class GTNTracker(GameTracker):
+	# Any guess in the original range is valid, even one that is already known
+	# to be wrong. The bounds are unlimited, so guesses have no fixed size 
+	# binary form. 
+	move_schema = MoveSchema(
+		Int('guess', 'self._range.start', 'self._range.stop', fmt=None))
+	
 	def __init__(self, n_players:int, upper:int, lower:int=0, playerid:int=-1):
 		super().__init__(n_players)
 		"""
@@ -11,13 +27,15 @@ class GTNTracker(GameTracker):
 			playerid:int=-1 - The id of the player that created this tracker. 
 				If the tracker was created by the host, the id is -1 (default).
 		"""
+		# Only the remaining interval is stored so that arbitrarily large 
+		# bounds cost nothing extra
 		self._upper = upper
 		self._lower = lower
+		self._range = range(lower, upper)
+		self._playerid = playerid
+		self._guesses = 0
 		self._is_done = False
 	
-	def make_move(self, guess, *args, **kwargs):
-		return {'guess':guess}
-	
 	def update(self, player:int, guess:int, higher:bool, correct:bool):
 		"""
 		params:
@@ -25,6 +43,7 @@ class GTNTracker(GameTracker):
 			higher:bool - If True, the true value is higher than the guess
 			correct:bool - If True, the guess was correct
 		"""
+		self._guesses += 1
 		if correct:
 			self._upper = guess
 			self._lower = guess
@@ -35,6 +54,57 @@ class GTNTracker(GameTracker):
 		else:
 			self._upper = guess
 	
+	def snapshot(self)->bytes:
+		"""
+		The header is followed by the current and the original bounds (as 
+		variable length signed integers so that huge ranges cost a few bytes),
+		one unsigned int of points per player and the forfeited players. 
+		"""
+		bounds = [_int_to_bytes(x) for x in (self._upper, self._lower, 
+			self._range.start, self._range.stop)]
+		header = _SNAPSHOT_HEADER.pack(_SNAPSHOT_VERSION, self._n_players, 
+			self._guesses, self._is_done, *map(len, bounds))
+		points = struct.pack(f'<{self._n_players}I', *self.points)
+		return b''.join([header, *bounds, points, self._pack_forfeited()])
+	
+	def restore(self, data:bytes)->'GTNTracker':
+		version, n_players, guesses, is_done, *lengths = \
+			_SNAPSHOT_HEADER.unpack_from(data)
+		assert version == _SNAPSHOT_VERSION, \
+			f'Unsupported snapshot version {version}!'
+		
+		offset = _SNAPSHOT_HEADER.size
+		bounds = []
+		for length in lengths:
+			bounds.append(int.from_bytes(data[offset:offset+length], 'little', 
+				signed=True))
+			offset += length
+		self._upper, self._lower, start, stop = bounds
+		self._range = range(start, stop)
+		self._n_players = n_players
+		self.points = list(struct.unpack_from(f'<{n_players}I', data, offset))
+		offset += 4*n_players
+		self._unpack_forfeited(data[offset:])
+		self._guesses = guesses
+		self._is_done = is_done
+		return self
+	
+	@classmethod
+	def from_snapshot(cls, data:bytes)->'GTNTracker':
+		# The players and the bounds are overwritten by restore
+		return cls(1, 1).restore(data)
+	
+	@property
+	def playerid(self)->int:
+		return self._playerid
+	
+	@property
+	def guesses(self)->int:
+		"""
+		The number of guesses made so far by all players
+		"""
+		return self._guesses
+	
 	@property
 	def upper(self):
 		"""
@@ -0,0 +1,58 @@
+"""
+Helpers to move cProfile statistics between a bot and the host. The stats are
+sent as plain JSON lists rather than marshal (which is what pstats uses on 
+disk) since the data comes from an untrusted bot process. 
+"""
+
+import io
+import pstats
+from typing import Dict, Iterable, List
+
+def encode_stats(stats:Dict)->List:
+	"""
+	Flattens the stats of a cProfile.Profile (after create_stats) into JSON 
+	serializable lists
+	"""
+	return [[*func, *timing[:4], [[*caller, *ctiming] 
+			for caller, ctiming in timing[4].items()]]
+		for func, timing in stats.items()]
+
+def decode_stats(data:List)->Dict:
+	"""
+	The inverse of encode_stats
+	"""
+	stats = {}
+	for entry in data:
+		callers = {tuple(c[:3]): tuple(c[3:]) for c in entry[7]}
+		stats[tuple(entry[:3])] = (*entry[3:7], callers)
+	return stats
+
+class _RawStats:
+	"""
+	Lets pstats.Stats load a stats dictionary directly. 
+	"""
+	def __init__(self, stats:Dict):
+		self.stats = stats
+	
+	def create_stats(self):
+		pass
+
+def merge_stats(stats:Iterable[Dict])->pstats.Stats:
+	"""
+	Merges several stats dictionaries into a single pstats.Stats
+	"""
+	stats = list(stats)
+	merged = pstats.Stats(_RawStats(stats[0]), stream=io.StringIO())
+	for s in stats[1:]:
+		merged.add(_RawStats(s))
+	return merged
+
+def format_stats(stats:pstats.Stats, top:int=30, 
+		sort:str='cumulative')->str:
+	"""
+	Renders the top entries of the stats as text
+	"""
+	stream = io.StringIO()
+	stats.stream = stream
+	stats.sort_stats(sort).print_stats(top)
+	return stream.getvalue()
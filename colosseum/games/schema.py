@@ -0,0 +1,194 @@
+"""
+Declarative move schemas. A GameTracker declares the fields of a move once,
+with their types and bounds, and the schema is compiled into a single python
+function that unpacks and validates a move. The host uses it to decode the
+responses of the bots and GameTracker.make_move uses it to build moves, so
+both sides agree on what a valid move is.
+
+Bounds and checks may be python expressions (as strings). They are evaluated
+with `self` bound to the GameTracker and every previously declared field
+bound to its value, i.e.
+
+	move_schema = MoveSchema(
+		Bool('horizontal'),
+		Int('row', 0, 'self.n - (not horizontal)'),
+		Int('col', 0, 'self.n - horizontal'),
+		check='not self.is_taken(horizontal, row, col)',
+	)
+"""
+
+import struct
+from abc import ABC, abstractmethod
+from typing import Dict, Tuple, Union
+
+Bound = Union[int, str]
+
+class InvalidMoveException(ValueError):
+	...
+
+class Field(ABC):
+	"""
+	A single field of a move
+	"""
+	# The struct format of the field in the binary codec
+	fmt = None
+	
+	def __init__(self, name:str):
+		"""
+		params:
+			name:str - The key of the field in the move. It must be a valid
+				python identifier.
+		"""
+		assert name.isidentifier() and name != 'self', \
+			f'{name!r} is not a valid field name!'
+		self.name = name
+	
+	@abstractmethod
+	def condition(self)->str:
+		"""
+		The python expression that is True if the field is valid
+		"""
+		...
+
+class Bool(Field):
+	fmt = '?'
+	
+	def condition(self)->str:
+		return f'type({self.name}) is bool'
+
+class Int(Field):
+	def __init__(self, name:str, lower:Bound=None, upper:Bound=None,
+			fmt:str='i'):
+		"""
+		params:
+			name:str - The key of the field in the move
+			lower:Bound=None - Inclusive lower bound, if any
+			upper:Bound=None - Exclusive upper bound, if any
+			fmt:str='i' - The struct format of the field in the binary codec.
+				None for ints of unlimited size, the schema then has no binary
+				codec. 
+		"""
+		super().__init__(name)
+		self.lower = lower
+		self.upper = upper
+		self.fmt = fmt
+	
+	def condition(self)->str:
+		# bools are ints to python but never a valid int field
+		parts = [f'type({self.name}) is int']
+		if self.lower is not None:
+			parts.append(f'({self.lower}) <= {self.name}')
+		if self.upper is not None:
+			parts.append(f'{self.name} < ({self.upper})')
+		return ' and '.join(parts)
+
+class MoveSchema:
+	"""
+	The compiled description of a move
+	"""
+	def __init__(self, *fields:Field, check:str=None):
+		"""
+		params:
+			*fields:Field - The fields of a move, in the order they are passed
+				to make_move and GameTracker.update
+			check:str=None - An expression over the fields and self that must
+				be True for a move to be valid, i.e. that a square is empty
+		"""
+		self.fields = fields
+		self.names = tuple(f.name for f in fields)
+		self.check = check
+		self._conditions = [(f.name, f.condition()) for f in fields]
+		if check is not None:
+			self._conditions.append(('check', check))
+		# decode(game, move)->tuple unpacks and validates a move received 
+		# from a bot. The fields are returned in declaration order, or None if
+		# the move is invalid. 
+		self.decode = self._compile()
+		self._struct = None
+		if all(f.fmt is not None for f in fields):
+			self._struct = struct.Struct('<' + ''.join(f.fmt for f in fields))
+	
+	def _compile(self):
+		lines = ['def decode(self, move):', '\ttry:']
+		lines += [f'\t\t{name} = move[{name!r}]' for name in self.names]
+		lines += ['\texcept (KeyError, TypeError):', '\t\treturn None']
+		for _, condition in self._conditions:
+			lines += [f'\tif not ({condition}):', '\t\treturn None']
+		lines.append(f'\treturn ({", ".join(self.names)},)')
+		source = '\n'.join(lines)
+		
+		namespace = {}
+		exec(compile(source, f'<move schema {self.names}>', 'exec'),
+			namespace)
+		return namespace['decode']
+	
+	def explain(self, game, move:Dict)->str:
+		"""
+		Describes why a move is invalid. This is the slow path, only use it
+		once decode has failed.
+		returns:
+			str - The reason, or None if the move is valid
+		"""
+		if not isinstance(move, dict):
+			return f'the move must be a dict, not {type(move).__name__}'
+		values = {'self': game}
+		for name, condition in self._conditions:
+			if name != 'check' and name not in move:
+				return f'{name} is missing'
+			values[name] = move.get(name)
+			try:
+				if eval(condition, {}, values):
+					continue
+			except Exception as e:
+				return f'{condition} raised {type(e).__name__}: {e}'
+			if name == 'check':
+				return f'{condition} is False'
+			return f'{name}={values[name]!r} does not satisfy {condition}'
+		return None
+	
+	def make(self, game, *args, **kwargs)->Dict:
+		"""
+		Builds a move from the fields (positionally or by name) and validates
+		it.
+		raises:
+			InvalidMoveException - If the move is invalid
+		"""
+		if len(args) > len(self.names):
+			raise TypeError(f'A move has {len(self.names)} fields '
+				f'({", ".join(self.names)}) but {len(args)} were given')
+		move = dict(zip(self.names, args), **kwargs)
+		if self.decode(game, move) is None:
+			raise InvalidMoveException(
+				f'Invalid move {move}: {self.explain(game, move)}')
+		return move
+	
+	@property
+	def codec(self)->struct.Struct:
+		"""
+		The binary codec of a move
+		raises:
+			TypeError - If a field has no struct format
+		"""
+		if self._struct is None:
+			raise TypeError(f'The move schema {self.names} has no binary '
+				'codec since not every field has a struct format')
+		return self._struct
+	
+	def pack(self, *values)->bytes:
+		"""
+		Packs the fields of a move (as returned by decode) into bytes
+		"""
+		return self.codec.pack(*values)
+	
+	def unpack(self, data:bytes, offset:int=0)->Tuple:
+		"""
+		The inverse of pack
+		"""
+		return self.codec.unpack_from(data, offset)
+	
+	@property
+	def size(self)->int:
+		"""
+		The number of bytes of a packed move
+		"""
+		return self.codec.size
\ No newline at end of file
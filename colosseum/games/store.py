@@ -0,0 +1,355 @@
+"""
+A persistent key-value and array store for bots, backed by a memory-mapped
+file (see Bot.store).
+
+The host decides where bots may keep their stores (GameClient's store_dir)
+and how large they may grow. Every bot module gets its own namespace in that
+directory. Bot processes of the same module that run at the same time each
+lock a separate slot, so they never write to the same file. Since the file is
+mapped rather than parsed, opening a store only walks the record headers, and
+the data itself is paged in as it is used. Writes reach the page cache
+immediately and therefore survive the bot being killed. flush() (called at the
+end of every game) only syncs the dirty pages to disk.
+
+The file is a header followed by records. Every record is a small header, the
+key and the value, with the key and the value each padded to 8 bytes so that
+arrays are aligned. Values are appended after the header and arrays are
+allocated from the end of the file downwards. Replacing a value with one of a
+different size appends a new record and marks the old one dead. Dead values
+are reclaimed when the store is opened or when it runs out of space. Arrays
+are handed out as views of the file, so they never move and the space of
+dead arrays is only reclaimed when the store is next opened.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, Tuple
+
+# Set by GameClient in the bot process
+STORE_ENV = 'COLOSSEUM_STORE'
+STORE_SIZE_ENV = 'COLOSSEUM_STORE_SIZE'
+
+DEFAULT_SIZE = 1<<24
+
+# magic, version, size of the store, end of the values, start of the arrays
+_HEADER = struct.Struct('<4sH2xQQQ')
+_HEADER_SIZE = 32
+_MAGIC = b'CLST'
+_VERSION = 2
+# kind, typecode (arrays only), length of the key, length of the value
+_RECORD = struct.Struct('<BcHI')
+_DEAD, _VALUE, _ARRAY = 0, 1, 2
+# Most bot processes of one module that may hold a store at the same time
+MAX_SLOTS = 64
+
+def _pad(n:int)->int:
+	return (n + 7) & ~7
+
+class StoreFullException(Exception):
+	...
+
+class Store:
+	"""
+	Maps str keys to bytes values or to typed arrays. Values are copied out
+	as bytes; arrays are memoryviews into the mapped file and are updated in
+	place.
+	"""
+	def __init__(self, path:str=None, size:int=DEFAULT_SIZE):
+		"""
+		params:
+			path:str=None - The path of the store without the slot and the
+				extension, i.e. <store_dir>/<bot_module>. If None (or no slot
+				is free), the store lives in memory and is lost on exit.
+			size:int=16MiB - The size of the store in bytes. A persisted store
+				that no longer fits is cleared.
+		"""
+		assert size > _HEADER_SIZE, f'A store needs more than {_HEADER_SIZE} ' \
+			f'bytes (given {size})!'
+		self._size = size
+		self._fd = None
+		self._path = None
+		self._index:Dict[str, Tuple[int, int, int, bytes]] = {}
+		self._dead = 0
+		
+		records = []
+		if path is not None:
+			self._fd, self._path = self._lock_slot(path)
+		if self._fd is not None:
+			records, rewrite = self._read_records()
+			if rewrite:
+				os.ftruncate(self._fd, 0)
+			os.ftruncate(self._fd, size)
+			self._mm = mmap.mmap(self._fd, size)
+		else:
+			rewrite = False
+			self._mm = mmap.mmap(-1, size)
+		
+		if records and not rewrite:
+			self._used, self._arrays = _HEADER.unpack_from(self._mm)[3:]
+			self._scan()
+		else:
+			self._used = _HEADER_SIZE
+			self._arrays = size
+			self._write_header()
+			for key, kind, typecode, value in records:
+				self._append(key, kind, typecode, value)
+	
+	@classmethod
+	def from_env(cls)->'Store':
+		"""
+		Opens the store the host has allowed this bot to use
+		"""
+		return cls(os.environ.get(STORE_ENV, None), 
+			int(os.environ.get(STORE_SIZE_ENV, DEFAULT_SIZE)))
+	
+	@staticmethod
+	def _lock_slot(path:str)->Tuple[int, str]:
+		for slot in range(MAX_SLOTS):
+			slot_path = f'{path}.{slot}.store'
+			fd = os.open(slot_path, os.O_RDWR | os.O_CREAT, 0o600)
+			try:
+				fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+			except BlockingIOError:
+				os.close(fd)
+				continue
+			return fd, slot_path
+		return None, None
+	
+	def _read_records(self)->Tuple[list, bool]:
+		"""
+		Reads the live records of an existing file
+		returns:
+			(records, rewrite) - rewrite is True if the records must be
+				written back compacted (or the store cleared), False if the
+				file can be mapped as it is
+		"""
+		header = os.pread(self._fd, _HEADER_SIZE, 0)
+		if len(header) < _HEADER_SIZE:
+			return [], True
+		magic, version, size, used, arrays = _HEADER.unpack_from(header)
+		if magic != _MAGIC or version != _VERSION or not \
+				_HEADER_SIZE <= used <= arrays <= size <= \
+				os.fstat(self._fd).st_size:
+			return [], True
+		data = os.pread(self._fd, size, 0)
+		records, live = [], {}
+		for key, kind, typecode, start, length in self._walk(data, used, 
+				arrays, size):
+			if kind != _DEAD:
+				live[key] = len(records)
+				records.append((key, kind, typecode, data[start:start+length]))
+		records = [records[i] for i in sorted(live.values())]
+		needed = _HEADER_SIZE + sum(_RECORD.size + _pad(len(key.encode())) +
+			_pad(len(value)) for key, _, _, value in records)
+		if needed > self._size:
+			return [], True
+		return records, size != self._size or \
+			needed < used + size - arrays
+	
+	@classmethod
+	def _walk(cls, data, used:int, arrays:int, 
+			size:int)->Iterator[Tuple[str, int, bytes, int, int]]:
+		"""
+		Walks the values and then the arrays of a store, see _records
+		"""
+		yield from cls._records(data, _HEADER_SIZE, used)
+		yield from cls._records(data, arrays, size)
+	
+	@staticmethod
+	def _records(data, offset:int, 
+			end:int)->Iterator[Tuple[str, int, bytes, int, int]]:
+		"""
+		Walks the records between offset and end
+		returns:
+			(key, kind, typecode, offset of the value, length of the value)
+		"""
+		while offset + _RECORD.size <= end:
+			kind, typecode, n_key, n_value = _RECORD.unpack_from(data, offset)
+			key_start = offset + _RECORD.size
+			value_start = key_start + _pad(n_key)
+			key = bytes(data[key_start:key_start+n_key]).decode()
+			yield key, kind, typecode, value_start, n_value
+			offset = value_start + _pad(n_value)
+	
+	def _scan(self):
+		for key, kind, typecode, start, length in self._walk(self._mm,
+				self._used, self._arrays, self._size):
+			record = start - _RECORD.size - _pad(len(key.encode()))
+			if kind == _DEAD:
+				if record < self._used:
+					self._dead += start - record + _pad(length)
+				continue
+			# Later records replace earlier ones
+			if key in self._index:
+				self._kill(key)
+			self._index[key] = (record, start, length, typecode)
+	
+	def _write_header(self):
+		_HEADER.pack_into(self._mm, 0, _MAGIC, _VERSION, self._size,
+			self._used, self._arrays)
+	
+	def _append(self, key:str, kind:int, typecode:bytes, value)->int:
+		"""
+		returns:
+			int - The offset of the value
+		"""
+		encoded = key.encode()
+		if len(encoded) > 0xffff:
+			raise KeyError(f'The key {key[:32]}... is too long')
+		n_record = _RECORD.size + _pad(len(encoded)) + _pad(len(value))
+		if self._used + n_record > self._arrays:
+			if self._dead:
+				self.compact()
+			if self._used + n_record > self._arrays:
+				raise StoreFullException(f'{n_record} bytes do not fit in the '
+					f'store ({self.free} bytes free)')
+		
+		offset = self._used if kind != _ARRAY else self._arrays - n_record
+		_RECORD.pack_into(self._mm, offset, kind, typecode, len(encoded),
+			len(value))
+		key_start = offset + _RECORD.size
+		self._mm[key_start:key_start+len(encoded)] = encoded
+		start = key_start + _pad(len(encoded))
+		self._mm[start:start+len(value)] = value
+		if kind != _ARRAY:
+			self._used += n_record
+		else:
+			self._arrays -= n_record
+		# The header is updated last so a partially written record is ignored
+		self._write_header()
+		if key in self._index:
+			self._kill(key)
+		self._index[key] = (offset, start, len(value), typecode)
+		return start
+	
+	def _kill(self, key:str):
+		record, start, length, _ = self._index.pop(key)
+		self._mm[record] = _DEAD
+		if record < self._used:
+			self._dead += start - record + _pad(length)
+	
+	def __getitem__(self, key:str)->bytes:
+		record, start, length, typecode = self._index[key]
+		return self._mm[start:start+length]
+	
+	def get(self, key:str, default:bytes=None)->bytes:
+		return self[key] if key in self._index else default
+	
+	def __setitem__(self, key:str, value:bytes):
+		value = memoryview(value).cast('B')
+		entry = self._index.get(key, None)
+		if entry is not None and entry[3] == b'\0' and \
+				_pad(entry[2]) == _pad(len(value)):
+			# Same size, overwrite in place
+			record, start, _, _ = entry
+			self._mm[start:start+len(value)] = value
+			_RECORD.pack_into(self._mm, record, _VALUE, b'\0',
+				len(key.encode()), len(value))
+			self._index[key] = (record, start, len(value), b'\0')
+		else:
+			self._append(key, _VALUE, b'\0', value)
+	
+	def __delitem__(self, key:str):
+		self._kill(key)
+	
+	def __contains__(self, key:str)->bool:
+		return key in self._index
+	
+	def __iter__(self)->Iterator[str]:
+		return iter(list(self._index))
+	
+	def __len__(self)->int:
+		return len(self._index)
+	
+	def array(self, key:str, typecode:str='d', length:int=None)->memoryview:
+		"""
+		Returns a typed array stored under key, creating it (zero filled) if
+		needed. The array is a view of the mapped file, so writes to it are
+		persisted without any further calls, and it never moves, so it may be
+		fetched as often as needed. Wrap it with numpy.frombuffer for a 
+		zero-copy numpy array.
+		params:
+			key:str - The name of the array
+			typecode:str='d' - The struct/array module typecode of the items
+			length:int=None - The number of items. Required to create the
+				array, checked if given for an existing one.
+		"""
+		itemsize = struct.calcsize(typecode)
+		entry = self._index.get(key, None)
+		if entry is None:
+			if length is None:
+				raise KeyError(key)
+			start = self._append(key, _ARRAY, typecode.encode(),
+				bytes(length*itemsize))
+			n_bytes = length*itemsize
+		else:
+			_, start, n_bytes, stored = entry
+			if stored != typecode.encode():
+				raise TypeError(f'{key} holds {stored.decode()!r} items, not '
+					f'{typecode!r}')
+			if length is not None and length*itemsize != n_bytes:
+				raise ValueError(f'{key} holds {n_bytes//itemsize} items, not '
+					f'{length}')
+		return memoryview(self._mm)[start:start+n_bytes].cast(typecode)
+	
+	def compact(self):
+		"""
+		Reclaims the space of dead values. Arrays are left where they are.
+		"""
+		records = [(key, typecode, self._mm[start:start+length])
+			for key, (record, start, length, typecode) in sorted(
+				self._index.items(), key=lambda item: item[1][0])
+			if record < self._used]
+		for key, _, _ in records:
+			del self._index[key]
+		self._used = _HEADER_SIZE
+		self._dead = 0
+		for key, typecode, value in records:
+			self._append(key, _VALUE, typecode, value)
+	
+	@property
+	def path(self)->str:
+		"""
+		The file backing the store, None if it is not persisted
+		"""
+		return self._path
+	
+	@property
+	def size(self)->int:
+		return self._size
+	
+	@property
+	def free(self)->int:
+		"""
+		The number of bytes that can still be allocated (not counting dead
+		records)
+		"""
+		return self._arrays - self._used
+	
+	def flush(self):
+		"""
+		Syncs the store to disk
+		"""
+		if self._fd is not None:
+			self._mm.flush()
+	
+	def close(self):
+		"""
+		Flushes the store and releases its slot. The mapping holds its own 
+		reference to the file (and so the lock), so it is only released once 
+		every array handed out has been released too. 
+		"""
+		self.flush()
+		if self._fd is not None:
+			os.close(self._fd)
+			self._fd = None
+		try:
+			self._mm.close()
+		except BufferError:
+			pass
+	
+	def __del__(self):
+		if getattr(self, '_fd', None) is not None:
+			os.close(self._fd)
\ No newline at end of file
@@ -0,0 +1,123 @@
+import os
+from collections import namedtuple
+from numbers import Number
+
+# Exit code used by a bot that ran out of memory so that the host can tell a 
+# limit violation apart from an ordinary crash
+MEMORY_EXIT_CODE = 120
+
+Usage = namedtuple('Usage', ['cpu', 'rss'])
+Usage.__doc__ = """
+Resource usage of a bot process. 
+	cpu - CPU time (user + system) in seconds
+	rss - Peak resident set size in bytes
+"""
+
+_CLK_TCK = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+def apply_limits(max_memory:int=None, max_cpu:Number=None, 
+		max_files:int=None):
+	"""
+	Applies resource limits to the current process. Called in the bot process
+	between fork and exec. 
+	params:
+		max_memory:int=None - Address space limit in bytes
+		max_cpu:Number=None - Soft CPU time limit in seconds
+		max_files:int=None - Open file descriptor limit
+	"""
+	# Imported here so that bots, which only need MEMORY_EXIT_CODE, do not 
+	# load it
+	import resource
+	for limit, value in ((resource.RLIMIT_AS, max_memory), 
+			(resource.RLIMIT_NOFILE, max_files)):
+		if value is not None:
+			resource.setrlimit(limit, (value, value))
+	if max_cpu is not None:
+		# Only the soft limit is set so that the host can extend it with 
+		# every new game
+		_, hard = resource.getrlimit(resource.RLIMIT_CPU)
+		soft = int(-(-max_cpu//1))
+		if hard != resource.RLIM_INFINITY:
+			soft = min(soft, hard)
+		resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+def extend_cpu_limit(pid:int, seconds:Number, since:Number=None):
+	"""
+	Sets the soft CPU limit of a running process to since plus seconds. Does
+	nothing where prlimit is unavailable. 
+	params:
+		since:Number=None - The CPU time the budget is counted from. Defaults
+			to the current CPU time of the process
+	"""
+	import resource
+	if not hasattr(resource, 'prlimit'):
+		return
+	if since is None:
+		usage = read_usage(pid)
+		if usage is None:
+			return
+		since = usage.cpu
+	try:
+		_, hard = resource.prlimit(pid, resource.RLIMIT_CPU)
+		soft = int(-(-(since + seconds)//1))
+		if hard != resource.RLIM_INFINITY:
+			soft = min(soft, hard)
+		resource.prlimit(pid, resource.RLIMIT_CPU, (soft, hard))
+	except OSError:
+		pass
+
+def reset_peak_rss(pid:int):
+	"""
+	Resets the peak resident set size of a process so that the next sample 
+	only covers the current game. Linux only. 
+	"""
+	try:
+		with open(f'/proc/{pid}/clear_refs', 'w') as f:
+			f.write('5')
+	except OSError:
+		pass
+
+def read_usage(pid:int)->Usage:
+	"""
+	Samples the resource usage of a running process via /proc. 
+	returns:
+		Usage - The usage of the process or None if it cannot be read
+	"""
+	try:
+		with open(f'/proc/{pid}/stat') as f:
+			stat = f.read()
+		with open(f'/proc/{pid}/status') as f:
+			status = f.read()
+	except OSError:
+		return None
+	
+	# The process name may contain spaces so start after its closing paren
+	fields = stat[stat.rindex(')')+2:].split()
+	cpu = (int(fields[11]) + int(fields[12]))/_CLK_TCK
+	rss = 0
+	for line in status.splitlines():
+		if line.startswith('VmHWM:'):
+			rss = int(line.split()[1])*1024
+			break
+	return Usage(cpu, rss)
+
+def rusage_to_usage(rusage)->Usage:
+	"""
+	Converts the resource.struct_rusage returned by os.wait4 into Usage
+	"""
+	return Usage(rusage.ru_utime + rusage.ru_stime, rusage.ru_maxrss*1024)
+
+def wait(pid:int, options:int=0):
+	"""
+	Like os.wait4 but returns the rusage as Usage. os.wait4 imports the 
+	resource module lazily, which fails while the interpreter is shutting 
+	down, so this falls back to os.waitpid (and a usage of None). 
+	returns:
+		(pid, status, Usage)
+	"""
+	try:
+		pid, status, rusage = os.wait4(pid, options)
+	except ImportError:
+		pid, status = os.waitpid(pid, options)
+		return pid, status, None
+	return pid, status, rusage_to_usage(rusage)
\ No newline at end of file
@@ -1,6 +1,11 @@
 __all__ = ['TimeoutException', 'CommunicationManager', 'FileNoComs', 
-	'ProcessDiedException']
+	'ProcessDiedException', 'SocketComs', 'broadcast']
+
+from colosseum.lazy import lazy_exports
 
 from .communication import CommunicationManager, TimeoutException, \
-	ProcessDiedException
-from .filenocoms import FileNoComs
\ No newline at end of file
+	ProcessDiedException, broadcast
+from .filenocoms import FileNoComs
+
+# Bots only ever talk over pipes
+__getattr__, __dir__ = lazy_exports(__name__, {'SocketComs': 'socketcoms'})
\ No newline at end of file
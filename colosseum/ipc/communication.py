@@ -1,9 +1,10 @@
 import json
-import signal
+import select
 import sys
 from abc import ABC, abstractmethod
 from numbers import Number
-from typing import Dict, Callable
+from time import monotonic
+from typing import Dict, Callable, Iterable
 
 class ProcessDiedException(Exception):
 	...
@@ -12,10 +13,40 @@ class TimeoutException(Exception):
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 
-def _timeout(signum, frame):
-	raise TimeoutException()
-# Register the timeout
-signal.signal(signal.SIGALRM, _timeout)
+def read_line(buffer:bytearray, fileno:int, read:Callable[[], bytes], 
+		deadline:float=None)->str:
+	"""
+	Reads the next line from a file descriptor. Bytes read past the end of 
+	the line are kept in buffer for the next call. 
+	params:
+		buffer:bytearray - The bytes read but not yet returned
+		fileno:int - The file descriptor to wait on
+		read:Callable[[], bytes] - Reads whatever is available, b'' on EOF
+		deadline:float=None - The time.monotonic() by which the line must have
+			arrived. Waits forever if None. 
+	raises:
+		TimeoutException - If the deadline passed first. Nothing is lost, 
+			the next call continues where this one stopped. 
+		ProcessDiedException - If the other end closed the connection
+	"""
+	while True:
+		end = buffer.find(b'\n')
+		if end != -1:
+			line = buffer[:end+1].decode()
+			del buffer[:end+1]
+			return line
+		if deadline is not None:
+			# A deadline per connection instead of a process wide alarm, so 
+			# that any thread can wait on its own bots
+			remaining = deadline - monotonic()
+			poller = select.poll()
+			poller.register(fileno, select.POLLIN)
+			if remaining <= 0 or not poller.poll(remaining*1000):
+				raise TimeoutException()
+		chunk = read()
+		if not chunk:
+			raise ProcessDiedException()
+		buffer += chunk
 
 class CommunicationManager(ABC):
 	"""
@@ -71,9 +102,9 @@ class CommunicationManager(ABC):
 	
 	def deregister(self, command):
 		"""
-		Deregister the given command
+		Deregister the given command, if it is registered
 		"""
-		self._commands.pop(command)
+		self._commands.pop(command, None)
 	
 	def log(self, *args, **kwargs):
 		if self._is_child:
@@ -81,8 +112,24 @@ class CommunicationManager(ABC):
 		else:
 			self._log(*args, **kwargs)
 	
+	@staticmethod
+	def encode(**kwargs)->bytes:
+		"""
+		Serializes a message into the form it is sent in. 
+		"""
+		return (json.dumps(kwargs)+'\n').encode()
+	
 	def send(self, **kwargs):
-		self._send_str(json.dumps(kwargs)+'\n')
+		self.send_encoded(self.encode(**kwargs))
+	
+	def send_encoded(self, data:bytes):
+		"""
+		Sends a message that was already serialized with encode()
+		"""
+		self._send_bytes(data)
+	
+	def _send_bytes(self, data:bytes):
+		self._send_str(data.decode())
 	
 	def recv(self, timeout:Number=None)->Dict:
 		"""
@@ -90,45 +137,76 @@ class CommunicationManager(ABC):
 		params:
 			timeout:Number=None - If specified, this will override the default
 				timeout set on initialization.
+		raises:
+			ValueError - If the message is not a JSON object, a builtin 
+				command is malformed or its handler rejects it
 		"""
 		if timeout is None:
 			timeout = self._timeout
+		# The timeout covers every message read until a response arrives
+		deadline = monotonic() + timeout if timeout else None
 		
-		if timeout:
-			signal.alarm(timeout)
+		while True:
+			try:
+				msg = self._recv_str(deadline)
+				if not msg:
+					return msg
+			except ProcessDiedException:
+				if self._is_child:
+					self.close()
+					exit(0)
+				raise
+			
+			response = json.loads(msg)
+			if not isinstance(response, dict):
+				raise ValueError('Expected a JSON object, not '
+					f'{type(response).__name__}')
+			# Run any registered commands
+			for c, f in list(self._commands.items()):
+				params = response.pop(c, None)
+				if params is not None:
+					self._run_command(c, f, params)
+			
+			if response:
+				return response
+	
+	@staticmethod
+	def _run_command(command:str, f:Callable, params):
+		"""
+		Calls the handler of a builtin command. Whatever the other side sent 
+		is untrusted, so a malformed payload and any error of the handler are
+		raised as a ValueError. 
+		"""
+		if not isinstance(params, dict):
+			raise ValueError(f'Malformed {command} command')
+		args = params.get('args', [])
+		kwargs = params.get('kwargs', {})
+		if not isinstance(args, list) or not isinstance(kwargs, dict):
+			raise ValueError(f'Malformed {command} command')
 		try:
-			msg = self._recv_str()
-			if not msg:
-				return msg
-		except ProcessDiedException:
-			if self._is_child:
-				self._close()
-				exit(0)
-		if timeout:
-			signal.alarm(0)
-		
-		response = json.loads(msg)
-		# Run any registered commands
-		for c, f in self._commands.items():
-			params = response.pop(c, None)
-			if params is not None:
-				f(
-					*params.get('args', []),
-					**params.get('kwargs', {})
-				)
-		
-		if response:
-			return response
-		else:
-			return self.recv(timeout=timeout)
+			f(*args, **kwargs)
+		except Exception as e:
+			raise ValueError(f'The {command} command failed: '
+				f'{type(e).__name__}: {e}') from e
 	
 	@abstractmethod
 	def _send_str(self, msg:str):
 		...
 	
 	@abstractmethod
-	def _recv_str(self)->str:
+	def _recv_str(self, deadline:float=None)->str:
+		"""
+		Reads the next message, see read_line
+		"""
 		...
 	
 	def __del__(self):
-		self.close()
\ No newline at end of file
+		self.close()
+
+def broadcast(targets:Iterable[CommunicationManager], **kwargs):
+	"""
+	Sends the same message to every target, serializing it only once. 
+	"""
+	data = CommunicationManager.encode(**kwargs)
+	for coms in targets:
+		coms.send_encoded(data)
\ No newline at end of file
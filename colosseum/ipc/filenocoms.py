@@ -1,7 +1,7 @@
 import os
 import sys
 
-from .communication import CommunicationManager, ProcessDiedException
+from .communication import CommunicationManager, read_line
 
 class FileNoComs(CommunicationManager):
 	"""
@@ -15,21 +15,26 @@ class FileNoComs(CommunicationManager):
 		if write_fileno == -1:
 			write_fileno = sys.stdout.fileno()
 		
-		self._read = os.fdopen(read_fileno, 'r')
+		self._read = read_fileno
+		self._buffer = bytearray()
 		self._write = os.fdopen(write_fileno, 'w')
 	
 	def _close(self):
-		self._read.close()
+		os.close(self._read)
 		self._write.close()
 	
 	def _send_str(self, msg:str):
 		self._write.write(msg)
 		self._write.flush()
 	
-	def _recv_str(self)->str:
-		while True:
-			msg = self._read.readline()
-			if msg:
-				return msg
-			else:
-				raise ProcessDiedException
\ No newline at end of file
+	def _send_bytes(self, data:bytes):
+		# Skip the text layer and write straight to the pipe. _send_str always
+		# flushes so nothing can be left in the buffer ahead of this. 
+		fileno = self._write.fileno()
+		view = memoryview(data)
+		while view:
+			view = view[os.write(fileno, view):]
+	
+	def _recv_str(self, deadline:float=None)->str:
+		return read_line(self._buffer, self._read, 
+			lambda: os.read(self._read, 1<<16), deadline)
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import socket
+from typing import Tuple
+
+from .communication import CommunicationManager, read_line
+
+def parse_address(address:str)->Tuple[int, object]:
+	"""
+	Parses an address string into a socket family and a socket address. 
+	Addresses of the form `unix:<path>` are Unix domain sockets, everything 
+	else is treated as `<host>:<port>` over TCP. 
+	params:
+		address:str - The address to parse
+	returns:
+		(family, sockaddr) - Arguments suitable for socket.socket/connect
+	"""
+	if address.startswith('unix:'):
+		return socket.AF_UNIX, address[len('unix:'):]
+	host, _, port = address.rpartition(':')
+	if not host or not port:
+		raise ValueError(f'Invalid address "{address}"! Expected host:port '
+			'or unix:<path>')
+	return socket.AF_INET, (host, int(port))
+
+def listen(address:str, backlog:int=16)->socket.socket:
+	"""
+	Creates a listening socket bound to the given address. 
+	"""
+	family, sockaddr = parse_address(address)
+	if family == socket.AF_UNIX and os.path.exists(sockaddr):
+		os.unlink(sockaddr)
+	sock = socket.socket(family, socket.SOCK_STREAM)
+	if family != socket.AF_UNIX:
+		sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+	sock.bind(sockaddr)
+	sock.listen(backlog)
+	return sock
+
+class SocketComs(CommunicationManager):
+	"""
+	IPC via a connected stream socket (TCP or Unix domain). 
+	"""
+	def __init__(self, is_child, sock:socket.socket):
+		"""
+		params:
+			is_child:bool - True if the current process should be treated as 
+				the child process. 
+			sock:socket.socket - A connected stream socket
+		"""
+		super().__init__(is_child)
+		
+		self._sock = sock
+		if sock.family != socket.AF_UNIX:
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		self._buffer = bytearray()
+		self._write = sock.makefile('w')
+	
+	@classmethod
+	def connect(cls, address:str, is_child:bool=False)->'SocketComs':
+		"""
+		Connects to the given address and wraps the connection. 
+		params:
+			address:str - `<host>:<port>` or `unix:<path>`
+			is_child:bool=False - See CommunicationManager
+		"""
+		family, sockaddr = parse_address(address)
+		sock = socket.socket(family, socket.SOCK_STREAM)
+		sock.connect(sockaddr)
+		return cls(is_child, sock)
+	
+	def _close(self):
+		self._write.close()
+		self._sock.close()
+	
+	def _send_str(self, msg:str):
+		self._write.write(msg)
+		self._write.flush()
+	
+	def _recv_str(self, deadline:float=None)->str:
+		return read_line(self._buffer, self._sock.fileno(), 
+			lambda: self._sock.recv(1<<16), deadline)
\ No newline at end of file
@@ -0,0 +1,29 @@
+import sys
+from importlib import import_module
+from typing import Callable, Dict, List, Tuple
+
+def lazy_exports(package:str, exports:Dict[str, str])->Tuple[Callable, 
+		Callable]:
+	"""
+	Builds a module level __getattr__ and __dir__ (PEP 562) that import the 
+	exported names of a package on first access. Bot processes import the 
+	game packages for their GameTracker only, so nothing else should be 
+	loaded up front. 
+	params:
+		package:str - The __name__ of the package
+		exports:Dict[str, str] - Maps every exported name to the submodule 
+			(relative to the package) that defines it
+	returns:
+		(__getattr__, __dir__)
+	"""
+	def __getattr__(name:str):
+		submodule = exports.get(name, None)
+		if submodule is None:
+			raise AttributeError(
+				f'module {package!r} has no attribute {name!r}')
+		return getattr(import_module(f'.{submodule}', package), name)
+	
+	def __dir__()->List[str]:
+		return sorted(set(vars(sys.modules[package])) | set(exports))
+	
+	return __getattr__, __dir__
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Exposes tournament throughput and bot health in the Prometheus text format. 
+
+Nothing is recorded on the hot path beyond what the hosters and clients keep 
+anyway (game counts, forfeits and the duration of every turn). Metrics reads
+those whenever it is rendered, so the cost of exporting is paid by the 
+exporter thread rather than by the games. 
+"""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from numbers import Number
+from time import time
+from typing import List
+
+def _quantile(values:List[float], q:float)->float:
+	"""
+	Nearest rank quantile of sorted values
+	"""
+	if not values:
+		return float('nan')
+	return values[min(int(q*len(values)), len(values)-1)]
+
+def _labels(**labels)->str:
+	return ','.join(f'{k}="{v}"' for k, v in labels.items())
+
+class Metrics:
+	"""
+	Collects metrics from one or more GameHosters. 
+	"""
+	QUANTILES = (0.5, 0.9, 0.99)
+	
+	def __init__(self, hosters:List=(), window:Number=5):
+		"""
+		params:
+			hosters:List[GameHoster]=() - The hosters to collect from
+			window:Number=5 - The number of seconds the rates are averaged 
+				over
+		"""
+		self._hosters = list(hosters)
+		self._window = window
+		self._lock = threading.Lock()
+		now = time()
+		self._start = now
+		self._prev = self._curr = (now, 0, 0)
+	
+	def add(self, hoster):
+		"""
+		Starts collecting from another GameHoster
+		"""
+		self._hosters.append(hoster)
+	
+	def clients(self)->List:
+		"""
+		Every GameClient of the hosters once. Hosters sharing a bot process 
+		through sessions share its client, and its counters with it. 
+		"""
+		clients = {}
+		for h in self._hosters:
+			for p in h.players:
+				clients.setdefault(id(p.client), p.client)
+		return list(clients.values())
+	
+	@property
+	def games(self)->int:
+		return sum(h.n_games for h in self._hosters)
+	
+	@property
+	def moves(self)->int:
+		return sum(c.turns for c in self.clients())
+	
+	@property
+	def forfeits(self)->int:
+		return sum(sum(h.forfeits) for h in self._hosters)
+	
+	@property
+	def active_bots(self)->int:
+		return sum(c.pid is not None for c in self.clients())
+	
+	def rates(self)->tuple:
+		"""
+		returns:
+			(games/s, moves/s) - Averaged over the last window to 2*window 
+				seconds
+		"""
+		now, games, moves = time(), self.games, self.moves
+		with self._lock:
+			if now - self._curr[0] >= self._window:
+				self._prev, self._curr = self._curr, (now, games, moves)
+			t, g, m = self._prev
+		elapsed = max(now - t, 1e-9)
+		return (games - g)/elapsed, (moves - m)/elapsed
+	
+	def render(self)->str:
+		"""
+		Renders every metric in the Prometheus text exposition format
+		"""
+		games_per_sec, moves_per_sec = self.rates()
+		lines = []
+		def metric(name:str, kind:str, help:str, samples:list):
+			lines.append(f'# HELP {name} {help}')
+			lines.append(f'# TYPE {name} {kind}')
+			for labels, value in samples:
+				labels = f'{{{labels}}}' if labels else ''
+				lines.append(f'{name}{labels} {value}')
+		
+		metric('colosseum_games_total', 'counter', 'Games played', 
+			[('', self.games)])
+		metric('colosseum_moves_total', 'counter', 'Turns taken by bots', 
+			[('', self.moves)])
+		metric('colosseum_games_per_second', 'gauge', 
+			'Recent game throughput', [('', f'{games_per_sec:.3f}')])
+		metric('colosseum_moves_per_second', 'gauge', 
+			'Recent move throughput', [('', f'{moves_per_sec:.3f}')])
+		metric('colosseum_active_bots', 'gauge', 'Running bot processes', 
+			[('', self.active_bots)])
+		metric('colosseum_uptime_seconds', 'gauge', 
+			'Seconds since the metrics were created', 
+			[('', f'{time() - self._start:.3f}')])
+		
+		# Forfeits belong to a seat in a hoster, everything else to the bot 
+		# process, which may be shared by several hosters
+		forfeits, restarts, latency = [], [], []
+		for h_id, h in enumerate(self._hosters):
+			for player, (p, n_forfeits) in enumerate(zip(h.players, 
+					h.forfeits)):
+				labels = _labels(hoster=h_id, player=player, bot=p.bot_module)
+				forfeits.append((labels, n_forfeits))
+		for c_id, c in enumerate(self.clients()):
+			labels = _labels(client=c_id, bot=c.bot_module)
+			restarts.append((labels, c.restarts))
+			latencies = sorted(c.latencies)
+			for q in self.QUANTILES:
+				latency.append(f'colosseum_move_latency_seconds{{{labels},'
+					f'quantile="{q}"}} {_quantile(latencies, q):.6f}')
+			latency.append(f'colosseum_move_latency_seconds_sum{{{labels}}} '
+				f'{c.turn_time:.6f}')
+			latency.append(
+				f'colosseum_move_latency_seconds_count{{{labels}}} {c.turns}')
+		metric('colosseum_forfeits_total', 'counter', 'Games forfeited', 
+			forfeits)
+		metric('colosseum_bot_restarts_total', 'counter', 
+			'Bot processes respawned', restarts)
+		metric('colosseum_move_latency_seconds', 'summary', 
+			'Time taken to answer a turn, as seen by the host', [])
+		lines.extend(latency)
+		return '\n'.join(lines) + '\n'
+
+class MetricsExporter:
+	"""
+	Periodically writes the metrics to a file (i.e. for the node exporter's 
+	textfile collector) and/or serves them over HTTP. 
+	"""
+	def __init__(self, metrics:Metrics, path:str=None, port:int=None, 
+			interval:Number=5, host:str='127.0.0.1'):
+		"""
+		params:
+			metrics:Metrics - The metrics to export
+			path:str=None - If given, the file the metrics are written to 
+				every interval seconds. The file is replaced atomically. 
+			port:int=None - If given, the metrics are served on 
+				http://<host>:<port>/metrics
+			interval:Number=5 - Seconds between writes of the file
+			host:str='127.0.0.1' - The interface the HTTP server binds to
+		"""
+		self._metrics = metrics
+		self._path = path
+		self._interval = interval
+		self._stop = threading.Event()
+		self._threads = []
+		self._server = None
+		
+		if path is not None:
+			self._threads.append(threading.Thread(target=self._write_loop, 
+				daemon=True))
+		if port is not None:
+			self._server = ThreadingHTTPServer((host, port), 
+				self._handler_type())
+			self._threads.append(threading.Thread(
+				target=self._server.serve_forever, daemon=True))
+		for t in self._threads:
+			t.start()
+	
+	@property
+	def port(self)->int:
+		"""
+		The port the metrics are served on, None if they are not served
+		"""
+		return self._server.server_address[1] if self._server else None
+	
+	def _handler_type(self)->type:
+		metrics = self._metrics
+		class Handler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				if self.path not in ('/', '/metrics'):
+					self.send_error(404)
+					return
+				body = metrics.render().encode()
+				self.send_response(200)
+				self.send_header('Content-Type', 
+					'text/plain; version=0.0.4; charset=utf-8')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+			
+			def log_message(self, *args):
+				pass
+		return Handler
+	
+	def write(self):
+		"""
+		Writes the metrics to the file now
+		"""
+		tmp = f'{self._path}.tmp'
+		with open(tmp, 'w') as f:
+			f.write(self._metrics.render())
+		os.replace(tmp, self._path)
+	
+	def _write_loop(self):
+		while not self._stop.wait(self._interval):
+			self.write()
+	
+	def close(self):
+		"""
+		Stops exporting. The file is written one last time. 
+		"""
+		if self._stop.is_set():
+			return
+		self._stop.set()
+		if self._server is not None:
+			self._server.shutdown()
+			self._server.server_close()
+		for t in self._threads:
+			t.join()
+		if self._path is not None:
+			self.write()
\ No newline at end of file
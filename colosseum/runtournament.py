@@ -1,11 +1,49 @@
+import random
+import sys
 from time import time
 
 from progress.bar import FillingSquaresBar
 
+from colosseum.cache import ResultCache
 from colosseum.games import dotsnboxes as dnb
 from colosseum.games import guessthatnumber as gtn
+from colosseum.metrics import Metrics, MetricsExporter
+from colosseum.spectator import Spectator
 
 game = 'dotsnboxes'
+# Set to a file path or unix:<path> to watch the games as they are played.
+# Watch a socket with `python3 -m colosseum.spectator unix:<path>`
+spectate = None
+spectator = Spectator(spectate) if spectate else None
+# Set to profile the first turns of every bot. The merged report is written 
+# to profile_report
+profile_turns = 0
+profile_report = 'profile_report.txt'
+# Set to export Prometheus metrics to a file (rewritten every few seconds) 
+# and/or serve them on http://127.0.0.1:<metrics_port>/metrics
+metrics_file = None
+metrics_port = None
+show_progress = True
+# Set to reuse the results of an identical earlier run. Results are keyed on 
+# the source of the bots and the game, the arguments and the seed
+cache_dir = None
+seed = None
+# Set to a directory to record every Dots and Boxes move as training data
+record_dir = None
+# Limits of every bot process. A bot that breaks one is killed, forfeits the 
+# game and is respawned. turn_timeout is in seconds (0 waits forever), 
+# max_cpu in CPU seconds per game and max_memory in bytes. Set turn_timeout 
+# to 0 when a human plays. 
+turn_timeout = 5
+max_memory = None
+max_cpu = None
+max_files = None
+# Print a line whenever a bot dies. The restarts are listed at the end either
+# way, and counted in the metrics. 
+report_failures = not show_progress
+# Part of the cache key since the limits can change the results
+client_params = {'turn_timeout': turn_timeout, 'max_memory': max_memory, 
+	'max_cpu': max_cpu, 'max_files': max_files}
 
 if game == 'guessthatnumber':
 	players = [
@@ -13,28 +51,82 @@ if game == 'guessthatnumber':
 		'colosseum.games.guessthatnumber.binarybot',
 		# 'colosseum.games.guessthatnumber.human',
 	]
-	hoster = gtn.GTNHoster(players)
+	hoster_type = gtn.GTNHoster
+	hoster_params = {}
 	start_game_args = (100,)
 elif game == 'dotsnboxes':
 	players = [
 		'colosseum.games.dotsnboxes.randombot',
 		'colosseum.games.dotsnboxes.randombot',
 	]
-	hoster = dnb.DnBHoster(players)
+	hoster_type = dnb.DnBHoster
+	hoster_params = {'recorder': dnb.Recorder(record_dir)} if record_dir \
+		else {}
 	start_game_args = ()
 
 n = 1000
+cache = ResultCache(cache_dir) if cache_dir else None
+if cache is not None:
+	key = cache.key(hoster_type, players, n, *start_game_args, seed=seed, 
+		hoster_params=client_params)
+	cached = cache.get(key)
+	if cached is not None:
+		print(f'Reusing {len(cached)} cached games')
+		for player, points in zip(players, zip(*cached)):
+			print(f'{player:<45} {sum(points)/len(cached):>8.3f}')
+		sys.exit()
+
+random.seed(seed)
+hoster = hoster_type(players, spectator=spectator, 
+	report_failures=report_failures, **hoster_params, **client_params)
+metrics = Metrics([hoster])
+exporter = MetricsExporter(metrics, metrics_file, metrics_port) \
+	if metrics_file or metrics_port else None
+
+class Bar(FillingSquaresBar):
+	suffix = '%(percent)d%% [%(index)d/%(max)d] %(games_per_sec).1f game/s ' \
+		'%(moves_per_sec).0f move/s remaining: %(eta)ds'
+	
+	@property
+	def games_per_sec(self):
+		return metrics.rates()[0]
+	
+	@property
+	def moves_per_sec(self):
+		return metrics.rates()[1]
+
+if profile_turns:
+	hoster.profile(profile_turns)
 print(f'Running {n} games...')
 cum_time = 0
-bar = FillingSquaresBar(
-	'Running games...',
-	suffix='%(percent)d%% [%(index)d/%(max)d] elapsed: %(elapsed)ds '
-		'remaining: %(eta)ds'
-)
-for _ in bar.iter(range(n)):
+results = []
+games = Bar('Running games...').iter(range(n)) if show_progress else range(n)
+for _ in games:
 	cum_time -= time()
-	hoster.start_game(*start_game_args)
+	results.append(hoster.start_game(*start_game_args))
 	cum_time += time()
+if cache is not None:
+	cache.put(key, results, cache.inputs(hoster_type, players, n, 
+		*start_game_args, seed=seed, hoster_params=client_params))
+if exporter is not None:
+	exporter.close()
+if spectator is not None:
+	spectator.close()
+if 'recorder' in hoster_params:
+	hoster_params['recorder'].close()
 print(f'{cum_time:0.3f} s of total runtime')
 print(f'{cum_time/n:0.3f} s/game')
-print(f'{n/cum_time:0.3f} game/s')
\ No newline at end of file
+print(f'{n/cum_time:0.3f} game/s')
+print()
+print(f'{"player":<45} {"points":>8} {"cpu/game":>10} {"peak rss":>10} '
+	f'{"startup":>10} {"restarts":>9} {"violations":>11}')
+for player, points, cpu, rss, startup, restarts, violations in zip(players, 
+		hoster.avg_points, hoster.total_cpu, hoster.peak_rss, 
+		hoster.startup_times, hoster.restarts, hoster.violations):
+	startup = '?' if startup is None else f'{1000*startup:0.1f}ms'
+	print(f'{player:<45} {points:>8.3f} {1000*cpu/n:>8.2f}ms '
+		f'{rss/2**20:>8.1f}MB {startup:>10} {restarts:>9} {violations:>11}')
+if profile_turns:
+	with open(profile_report, 'w') as f:
+		f.write(hoster.profile_report())
+	print(f'Profile written to {profile_report}')
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+Streams running games to spectators without slowing them down. The hoster 
+pushes every move into a bounded ring buffer (a single deque append) and a 
+background thread renders the most recent state at a limited frame rate and
+writes it to a file or to every client connected to a Unix socket. When the 
+renderer falls behind, the oldest events are dropped. Since the hoster keeps
+playing while the renderer runs, every event holds a snapshot of the game 
+rather than the live tracker. 
+
+usage: python3 -m colosseum.spectator unix:<path>
+"""
+
+import argparse
+import select
+import socket
+import sys
+import threading
+from collections import deque
+from itertools import count
+from numbers import Number
+from time import sleep
+
+from colosseum.games.gametracker import GameTracker
+from colosseum.ipc.socketcoms import listen, parse_address
+
+class Spectator:
+	"""
+	Renders games pushed by a GameHoster on a background thread. 
+	"""
+	def __init__(self, target:str, capacity:int=1024, max_fps:Number=10):
+		"""
+		params:
+			target:str - Where to stream the frames. `unix:<path>` serves 
+				every client that connects to the socket, anything else is a 
+				file that the frames are appended to. 
+			capacity:int=1024 - The number of events buffered before the 
+				oldest are dropped
+			max_fps:Number=10 - The most frames rendered per second
+		"""
+		self._events = deque(maxlen=capacity)
+		self._seq = count()
+		self._period = 1/max_fps
+		self._dropped = 0
+		self._last_seq = -1
+		self._frames = 0
+		self._closed = False
+		
+		self._server = None
+		# Every client's unsent bytes
+		self._clients = {}
+		self._file = None
+		if target.startswith('unix:'):
+			self._server = listen(target)
+			self._server.setblocking(False)
+		else:
+			self._file = open(target, 'a')
+		
+		self._thread = threading.Thread(target=self._run, daemon=True)
+		self._thread.start()
+	
+	def push(self, game_no:int, game, event:dict=None):
+		"""
+		Queues an event. Called by the hoster on the hot path, so this does 
+		nothing more than snapshot the game and append to the ring buffer. 
+		params:
+			game_no:int - The number of the game
+			game:GameTracker - The tracker of the game. Only the score is 
+				shown for games that do not support snapshots. 
+			event:dict=None - The move that was made, None for the start of 
+				the game
+		"""
+		if type(game).snapshot is not GameTracker.snapshot:
+			state = game.snapshot()
+		else:
+			# Rendering the board here would hold up the game
+			state = f'points: {list(game.points)}'
+		self._events.append((next(self._seq), game_no, type(game), state, 
+			getattr(game, 'moves', '?'), None if event is None else dict(event)))
+	
+	@property
+	def dropped(self)->int:
+		"""
+		The number of events that were dropped because the buffer was full
+		"""
+		return self._dropped
+	
+	@property
+	def frames(self)->int:
+		"""
+		The number of frames rendered
+		"""
+		return self._frames
+	
+	def close(self):
+		"""
+		Stops the renderer after rendering the last events still buffered
+		"""
+		if self._closed:
+			return
+		self._closed = True
+		self._thread.join()
+		self._accept()
+		self._render_latest()
+		for client in self._clients:
+			client.close()
+		self._clients.clear()
+		if self._server is not None:
+			self._server.close()
+		if self._file is not None:
+			self._file.close()
+	
+	def _run(self):
+		while not self._closed:
+			sleep(self._period)
+			self._accept()
+			self._render_latest()
+	
+	def _render_latest(self):
+		"""
+		Renders the most recent event and drops the ones before it
+		"""
+		latest = None
+		while self._events:
+			latest = self._events.popleft()
+			self._dropped += latest[0] - self._last_seq - 1
+			self._last_seq = latest[0]
+		if latest is not None:
+			self._write(self._render(*latest[1:]))
+			self._frames += 1
+	
+	def _render(self, game_no:int, tracker:type, state, moves, 
+			event:dict)->str:
+		header = f'== game {game_no} | move {moves}'
+		if event is not None:
+			header += ' | ' + ' '.join(f'{k}={v}' for k, v in event.items())
+		if isinstance(state, bytes):
+			try:
+				state = self._body(tracker.from_snapshot(state))
+			except Exception as e:
+				state = f'{tracker.__name__} could not be rendered: {e!r}'
+		return f'{header}\n{state}\n\n'
+	
+	@staticmethod
+	def _body(game)->str:
+		render = getattr(game, 'render', None)
+		return render() if render is not None else str(vars(game))
+	
+	def _accept(self):
+		if self._server is None:
+			return
+		while select.select([self._server], [], [], 0)[0]:
+			try:
+				client, _ = self._server.accept()
+			except BlockingIOError:
+				return
+			client.setblocking(False)
+			self._clients[client] = b''
+	
+	def _write(self, frame:str):
+		if self._file is not None:
+			self._file.write(frame)
+			self._file.flush()
+			return
+		data = frame.encode()
+		for client, pending in list(self._clients.items()):
+			# A spectator that has not caught up with the last frame misses 
+			# this one
+			if not pending:
+				pending = data
+			try:
+				sent = client.send(pending)
+			except BlockingIOError:
+				sent = 0
+			except OSError:
+				client.close()
+				del self._clients[client]
+				continue
+			self._clients[client] = pending[sent:]
+	
+	def __del__(self):
+		self.close()
+
+def watch(address:str):
+	"""
+	Prints the frames served by a Spectator until it goes away. 
+	"""
+	family, sockaddr = parse_address(address)
+	sock = socket.socket(family, socket.SOCK_STREAM)
+	sock.connect(sockaddr)
+	while True:
+		data = sock.recv(1 << 16)
+		if not data:
+			break
+		sys.stdout.write(data.decode(errors='replace'))
+		sys.stdout.flush()
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Watch a running tournament.')
+	parser.add_argument('address', help='unix:<path> of the spectator socket')
+	watch(parser.parse_args().address)
\ No newline at end of file
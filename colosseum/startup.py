@@ -0,0 +1,102 @@
+"""
+Reports how long bot processes take to start. For every bot, the imports are 
+broken down with `python3 -X importtime` and the time to first response is 
+measured by spawning the bot and waiting for it to answer a ping. 
+
+usage: python3 -m colosseum.startup <bot_module> [<bot_module> ...]
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict, namedtuple
+from statistics import median
+from typing import List
+
+from colosseum.games.gameclient import GameClient
+
+ImportTime = namedtuple('ImportTime', ['module', 'self_us', 'cumulative_us'])
+
+def import_times(bot_module:str)->List[ImportTime]:
+	"""
+	Imports the bot module in a fresh interpreter with -X importtime. 
+	returns:
+		List[ImportTime] - One entry per imported module, in import order
+	"""
+	result = subprocess.run(
+		['python3', '-X', 'importtime', '-c', f'import {bot_module}'],
+		stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, 
+		stderr=subprocess.PIPE, text=True)
+	times = []
+	for line in result.stderr.splitlines():
+		if not line.startswith('import time:'):
+			continue
+		fields = line[len('import time:'):].split('|')
+		if not fields[0].strip().isdigit():
+			# The header line
+			continue
+		times.append(ImportTime(fields[2].strip(), int(fields[0]), 
+			int(fields[1])))
+	return times
+
+def time_to_first_response(bot_module:str, runs:int=3)->float:
+	"""
+	returns:
+		float - Median seconds from spawning the bot to it answering a ping, 
+			None if the bot never started
+	"""
+	times = []
+	for _ in range(runs):
+		client = GameClient(bot_module)
+		startup = client.wait_ready()
+		del client
+		if startup is None:
+			return None
+		times.append(startup)
+	return median(times)
+
+def report(bot_module:str, top:int=10, runs:int=3)->float:
+	"""
+	Prints the startup report of one bot. 
+	returns:
+		float - The median time to first response
+	"""
+	times = import_times(bot_module)
+	by_package = defaultdict(int)
+	for t in times:
+		by_package[t.module.split('.')[0]] += t.self_us
+	total = sum(t.self_us for t in times)
+	
+	print(f'== {bot_module}')
+	print(f'imports: {len(times)} modules, {total/1000:0.1f} ms')
+	for package, us in sorted(by_package.items(), key=lambda x: -x[1])[:top]:
+		print(f'  {us/1000:8.1f} ms  {package}')
+	
+	startup = time_to_first_response(bot_module, runs)
+	if startup is None:
+		print('time to first response: the bot died while starting')
+	else:
+		print(f'time to first response: {startup*1000:0.1f} ms')
+	return startup
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(
+		description='Report the startup time of bots.')
+	parser.add_argument('bot_modules', nargs='+')
+	parser.add_argument('--top', type=int, default=10, 
+		help='Number of packages to list')
+	parser.add_argument('--runs', type=int, default=3, 
+		help='Number of spawns to take the median of')
+	parser.add_argument('--target', type=float, default=None, 
+		help='Fail if any bot takes longer than this many seconds')
+	args = parser.parse_args()
+	
+	slow = []
+	for bot_module in args.bot_modules:
+		startup = report(bot_module, args.top, args.runs)
+		if args.target is not None and (startup is None 
+				or startup > args.target):
+			slow.append(bot_module)
+	if slow:
+		print(f'Over the {args.target} s target: {", ".join(slow)}')
+		sys.exit(1)
\ No newline at end of file